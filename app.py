@@ -1,59 +1,185 @@
 """Flask application for eBay automation dashboard."""
+import atexit
 import logging
 import os
+import queue
+import base64
 import hashlib
-import json
-from datetime import datetime
-from flask import Flask, render_template, jsonify, request, redirect
+import re
+import time
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from functools import lru_cache
+import orjson
+from flask import Flask, Response, g, has_request_context, render_template, request, redirect
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from flask_caching import Cache
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 
 from config import Config
-from models import db, Listing, RelistHistory, OfferSent, SoldItem, AutomationLog, PoshmarkListing, EbayDraft
+from models import db, create_missing_indexes, Listing, OfferSent, SoldItem, AutomationLog, PoshmarkListing, EbayDraft, DashboardStats
 from automation import AutomationEngine
-from scheduler import AutomationScheduler
-from ebay_api import eBayAPI
+from scheduler import AutomationScheduler, enqueue_job, get_job, get_schedule
+from ebay_api import get_thread_api
 from poshmark_integration import PoshmarkScraperIntegration
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/ebay_automation.log'),
-        logging.StreamHandler()
-    ]
-)
+# Ensure logs directory exists
+os.makedirs('logs', exist_ok=True)
+
+# Configure logging: request threads only enqueue records, a background
+# listener thread does the file/console I/O. Several gunicorn workers and the
+# scheduler container append to the same file, so rotation is left to an
+# external logrotate; WatchedFileHandler reopens the file once it is moved.
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_file_handler = WatchedFileHandler('logs/ebay_automation.log')
+_log_stream_handler = logging.StreamHandler()
+for _handler in (_log_file_handler, _log_stream_handler):
+    _handler.setFormatter(_log_formatter)
+
+_log_queue_handler = QueueHandler(queue.SimpleQueue())
+_log_listener = None
+
+
+def _start_log_listener():
+    """Start the thread that drains queued log records.
+    
+    Threads don't survive fork (gunicorn preload), so forked children call
+    this again with a fresh queue rather than inheriting the parent's.
+    """
+    global _log_listener
+    _log_queue_handler.queue = queue.SimpleQueue()
+    _log_listener = QueueListener(_log_queue_handler.queue, _log_file_handler, _log_stream_handler)
+    _log_listener.start()
+
+
+_root_logger = logging.getLogger()
+_root_logger.setLevel(getattr(logging, Config.LOG_LEVEL))
+_root_logger.addHandler(_log_queue_handler)
+_start_log_listener()
+os.register_at_fork(after_in_child=_start_log_listener)
+atexit.register(lambda: _log_listener.stop())
 logger = logging.getLogger(__name__)
 
+
+# Stored timestamps are naive UTC; emit them as RFC 3339 with a Z suffix.
+# Non-string keys are stringified, as stdlib json does.
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def ojsonify(obj):
+    """Serialize obj to a JSON response with orjson (handles datetimes natively)."""
+    return Response(orjson.dumps(obj, option=ORJSON_OPTIONS), mimetype='application/json')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, for request.get_json() and extensions' jsonify."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # Create Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config.from_object(Config)
 
-# Ensure logs directory exists
-os.makedirs('logs', exist_ok=True)
-
 # Initialize database
 db.init_app(app)
 
+# Initialize response cache
+cache = Cache(app)
+STATS_CACHE_KEY = 'api_stats'
+METRICS_CACHE_KEY = 'api_metrics'
+JOBS_CACHE_KEY = 'api_jobs'
+# Paged Poshmark listing/draft responses, keyed per query string under a
+# generation counter that writes bump to drop every cached page at once
+POSHMARK_PAGES_CACHE_KEY = 'api_poshmark_listings'
+DRAFTS_PAGES_CACHE_KEY = 'api_drafts'
+PAGE_CACHE_TIMEOUT = 15
+# Browsers polling the dashboard may reuse these responses for a few seconds
+DASHBOARD_MAX_AGE = 5
+# Page sizes are client-controlled; clamp them to this range
+MAX_PER_PAGE = 200
+
+# Rate limiting (only applied to routes that opt in)
+limiter = Limiter(get_remote_address, app=app, storage_uri=Config.RATELIMIT_STORAGE_URI)
+
+# eBay user IDs: letters, digits and . _ - * only
+EBAY_USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9._\-*]{1,64}$')
+MAX_WEBHOOK_BODY_BYTES = 64 * 1024
+
 # Create automation engine and scheduler
 automation = AutomationEngine()
 scheduler = None
 
-
-@app.before_request
-def before_first_request():
-    """Initialize database and scheduler on first request."""
+# SQLite: WAL lets dashboard reads run while the scheduler process writes,
+# and synchronous=NORMAL is crash-safe under WAL without an fsync per commit
+with app.app_context():
+    @event.listens_for(db.engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+# Create database tables and start the scheduler once at startup rather than
+# checking on every request. In multi-worker deployments only one process
+# should own the scheduler (EBAY_RUN_SCHEDULER=0 everywhere else).
+with app.app_context():
+    db.create_all()
+    create_missing_indexes()
+    logger.info("Database initialized")
+
+# Per-request SQL query counting for debugging N+1 regressions
+if Config.SQL_QUERY_COUNT:
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def _count_query(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context():
+                g.query_count = g.get('query_count', 0) + 1
+    
+    @app.after_request
+    def _report_query_count(response):
+        query_count = g.get('query_count', 0)
+        response.headers['X-Query-Count'] = str(query_count)
+        if query_count > Config.SQL_QUERY_WARN_THRESHOLD:
+            logger.warning(f"{request.endpoint} issued {query_count} SQL queries")
+        return response
+
+# Cache invalidation for data written by queued jobs. These run in the
+# scheduler process, so they only reach the web workers through a shared
+# cache backend (RedisCache; gunicorn_conf.py refuses per-process caches)
+JOB_CALLBACKS = {
+    'relist': lambda: cache.delete_many(STATS_CACHE_KEY, METRICS_CACHE_KEY),
+    'poshmark_scrape': lambda: _invalidate_pages(POSHMARK_PAGES_CACHE_KEY),
+}
+
+if Config.RUN_SCHEDULER:
+    scheduler = AutomationScheduler(app, job_callbacks=JOB_CALLBACKS)
+    scheduler.start()
+    logger.info("Scheduler initialized")
+
+
+@app.cli.command('run-scheduler')
+def run_scheduler():
+    """Run the automation scheduler in a dedicated process."""
     global scheduler
     
     if scheduler is None:
-        # Create database tables
-        with app.app_context():
-            db.create_all()
-            logger.info("Database initialized")
-        
-        # Initialize and start scheduler
-        scheduler = AutomationScheduler(app)
+        scheduler = AutomationScheduler(app, job_callbacks=JOB_CALLBACKS)
         scheduler.start()
-        logger.info("Scheduler initialized")
+    logger.info("Scheduler running, press Ctrl+C to stop")
+    
+    try:
+        while True:
+            time.sleep(60)
+    except (KeyboardInterrupt, SystemExit):
+        scheduler.shutdown()
 
 
 @app.route('/')
@@ -74,69 +200,72 @@ def listings_view():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status', 'active')
-        
-        # Use existing API endpoint logic
-        offset = (page - 1) * per_page
-        
-        # Build query based on status
-        query = Listing.query
+        cursor = request.args.get('cursor')
+        
+        # Select only the columns the page shows (plus last_updated and id for
+        # the next-page cursor); the template reads the rows directly
+        stmt = db.select(
+            Listing.id,
+            Listing.item_id,
+            Listing.title,
+            Listing.price,
+            Listing.quantity,
+            Listing.view_count,
+            Listing.watch_count,
+            Listing.gallery_url,
+            Listing.is_active,
+            Listing.last_updated,
+            Listing.days_listed.label('days_listed'),
+            db.case((Listing.needs_attention, True), else_=False).label('is_stale'),
+            db.func.count().over().label('total')
+        )
         if status == 'active':
-            query = query.filter_by(is_active=True)
+            stmt = stmt.where(Listing.is_active.is_(True))
         elif status == 'stale':
-            # Find stale listings
-            stale_listings = []
-            all_listings = Listing.query.filter_by(is_active=True).all()
-            
-            for listing in all_listings:
-                if listing.start_time:
-                    days_since_created = (datetime.utcnow() - listing.start_time).days
-                    is_old_low_traffic = (days_since_created >= 30 and listing.view_count < 10)
-                    is_very_old = (days_since_created >= 60)
-                    is_definitely_stale = (days_since_created >= 90)
-                    
-                    if is_old_low_traffic or is_very_old or is_definitely_stale:
-                        stale_listings.append(listing)
-            
-            listing_ids = [l.id for l in stale_listings]
-            query = query.filter(Listing.id.in_(listing_ids))
+            stmt = stmt.where(Listing.is_active.is_(True), Listing.needs_attention)
         elif status == 'inactive':
-            query = query.filter_by(is_active=False)
-        
-        # Get total count
-        total = query.count()
-        
-        # Get paginated results
-        listings = query.offset(offset).limit(per_page).all()
-        
-        # Convert to display format
-        items = []
-        for listing in listings:
-            days_listed = 0
-            if listing.start_time:
-                days_listed = (datetime.utcnow() - listing.start_time).days
-            
-            items.append({
-                'item_id': listing.item_id,
-                'title': listing.title,
-                'price': listing.price,
-                'quantity': listing.quantity,
-                'view_count': listing.view_count,
-                'watch_count': listing.watch_count,
-                'days_listed': days_listed,
-                'gallery_url': listing.gallery_url,
-                'is_stale': days_listed >= 30 and listing.view_count < 10 or days_listed >= 60,
-                'is_active': listing.is_active
-            })
+            stmt = stmt.where(Listing.is_active.is_(False))
+        
+        # One query returns the page and, via count(*) OVER (), the total
+        # matching rows; same ordering as /api/listings
+        page = max(page, 1)
+        per_page = min(max(per_page, 1), MAX_PER_PAGE)
+        ordered = stmt.order_by(Listing.last_updated.desc(), Listing.id.desc())
+        if cursor:
+            # "Next" links seek past the previous page's last row instead of
+            # walking OFFSET rows; the window then counts only what remains
+            last_updated, last_id = _decode_cursor(cursor)
+            ordered = ordered.where(db.or_(
+                Listing.last_updated < last_updated,
+                db.and_(Listing.last_updated == last_updated, Listing.id < last_id)
+            ))
+            skipped = (page - 1) * per_page
+        else:
+            ordered = ordered.offset((page - 1) * per_page)
+            skipped = 0
+        rows = db.session.execute(ordered.limit(per_page)).all()
+        if rows:
+            total = skipped + rows[0].total
+        elif page > 1:
+            # Past the last page the window has no rows to report on
+            total = db.session.scalar(
+                db.select(db.func.count()).select_from(stmt.subquery())
+            )
+        else:
+            total = 0
         
-        total_pages = (total + per_page - 1) // per_page
+        next_cursor = None
+        if rows and total > page * per_page:
+            next_cursor = _encode_cursor(rows[-1].last_updated, rows[-1].id)
         
         return render_template('listings_view.html', 
-                             listings=items,
+                             listings=rows,
                              total=total,
                              page=page,
                              per_page=per_page,
                              status=status,
-                             total_pages=total_pages)
+                             next_cursor=next_cursor,
+                             total_pages=(total + per_page - 1) // per_page)
         
     except Exception as e:
         logger.error(f"Error in listings view: {e}")
@@ -153,10 +282,28 @@ def listings_view():
 @app.route('/health')
 def health():
     """Health check endpoint for Docker."""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()})
+    return ojsonify({'status': 'healthy', 'timestamp': datetime.utcnow()})
+
+
+@lru_cache(maxsize=64)
+def _forwarded_endpoint(forwarded_proto, forwarded_host):
+    """Build the public webhook URL seen by eBay behind a proxy."""
+    return f"{forwarded_proto}://{forwarded_host}/webhook/marketplace-account-deletion"
+
+
+@lru_cache(maxsize=1024)
+def _challenge_response(challenge_code, verification_token, endpoint):
+    """SHA256 of challengeCode + verificationToken + endpoint, as eBay expects."""
+    # Feed the parts straight into the hasher instead of concatenating first
+    digest = hashlib.sha256(challenge_code.encode('utf-8'))
+    digest.update(verification_token.encode('utf-8'))
+    digest.update(endpoint.encode('utf-8'))
+    return digest.hexdigest()
 
 
 @app.route('/webhook/marketplace-account-deletion', methods=['GET', 'POST'])
+# Only notifications are limited; eBay's verification challenge GETs must always answer
+@limiter.limit(Config.WEBHOOK_RATE_LIMIT, methods=['POST'])
 def marketplace_account_deletion():
     """
     eBay Marketplace Account Deletion notification endpoint.
@@ -182,7 +329,7 @@ def marketplace_account_deletion():
             forwarded_host = request.headers.get('X-Forwarded-Host') or request.headers.get('Host')
             
             if forwarded_host:
-                endpoint = f"{forwarded_proto}://{forwarded_host}/webhook/marketplace-account-deletion"
+                endpoint = _forwarded_endpoint(forwarded_proto, forwarded_host)
             else:
                 # Fallback to environment variable or request URL
                 endpoint = os.getenv('EBAY_ENDPOINT_URL')
@@ -191,9 +338,7 @@ def marketplace_account_deletion():
                     endpoint = endpoint.replace('http://', 'https://')  # Force https
             
             # Compute SHA256 hash: challengeCode + verificationToken + endpoint
-            hash_string = challenge_code + verification_token + endpoint
-            hash_object = hashlib.sha256(hash_string.encode('utf-8'))
-            challenge_response = hash_object.hexdigest()
+            challenge_response = _challenge_response(challenge_code, verification_token, endpoint)
             
             logger.info(f"Computed challenge response hash for endpoint: {endpoint}")
             
@@ -201,11 +346,18 @@ def marketplace_account_deletion():
             response = {
                 'challengeResponse': challenge_response
             }
-            return jsonify(response), 200
-        return jsonify({'error': 'No challenge code provided'}), 400
+            return ojsonify(response), 200
+        return ojsonify({'error': 'No challenge code provided'}), 400
     
     elif request.method == 'POST':
-        # Handle marketplace account deletion notification
+        # Handle marketplace account deletion notification.
+        # The X-EBAY-SIGNATURE header is NOT verified (that needs eBay's
+        # Notification API public key), so this is unauthenticated: the only
+        # guards are the rate limit, the body size cap and userId validation.
+        # A forged request can only delete data tied to the buyer it names.
+        if request.content_length and request.content_length > MAX_WEBHOOK_BODY_BYTES:
+            return ojsonify({'error': 'Payload too large'}), 413
+        
         try:
             data = request.get_json()
             logger.info(f"Received marketplace account deletion notification: {data}")
@@ -221,21 +373,21 @@ def marketplace_account_deletion():
                 user_id = deletion_data.get('userId')
                 marketplace_id = deletion_data.get('marketplaceId')
                 
+                if user_id and not EBAY_USER_ID_PATTERN.match(str(user_id)):
+                    logger.warning("Rejected account deletion notification with malformed user id")
+                    return ojsonify({'error': 'Invalid userId'}), 400
+                
                 logger.warning(f"Account deletion notification for user {user_id} on marketplace {marketplace_id}")
                 
                 # Delete user data from database
-                # Remove any sold items for this buyer
+                # Remove sold items and offers tied to this buyer, one DELETE each
                 deleted_count = 0
                 if user_id:
-                    sold_items = SoldItem.query.filter_by(buyer_id=user_id).all()
-                    for item in sold_items:
-                        db.session.delete(item)
-                        deleted_count += 1
-                    
-                    db.session.commit()
+                    deleted_count = SoldItem.query.filter_by(buyer_id=user_id).delete(synchronize_session=False)
+                    deleted_count += OfferSent.query.filter_by(buyer_id=user_id).delete(synchronize_session=False)
                     logger.info(f"Deleted {deleted_count} records for user {user_id}")
                 
-                # Log the deletion
+                # Log the deletion in the same transaction as the delete
                 log = AutomationLog(
                     action_type='account_deletion',
                     item_id=None,
@@ -246,57 +398,170 @@ def marketplace_account_deletion():
                 db.session.add(log)
                 db.session.commit()
                 
-                return jsonify({'status': 'success', 'notificationId': notification_id}), 200
+                return ojsonify({'status': 'success', 'notificationId': notification_id}), 200
             else:
                 logger.warning(f"Received unknown notification topic: {topic}")
-                return jsonify({'status': 'unknown_topic'}), 200
+                return ojsonify({'status': 'unknown_topic'}), 200
                 
         except Exception as e:
             logger.error(f"Error processing marketplace account deletion: {e}", exc_info=True)
-            return jsonify({'error': str(e)}), 500
+            return ojsonify({'error': str(e)}), 500
+    
+    return ojsonify({'error': 'Method not allowed'}), 405
+
+
+def _refresh_stats():
+    """Recompute dashboard counters after a manual action and drop the cached response."""
+    automation.refresh_dashboard_stats()
+    cache.delete_many(STATS_CACHE_KEY, METRICS_CACHE_KEY)
+
+
+def _page_cache_key(prefix):
+    """Cache key for the current request's page of a paged endpoint."""
+    generation = cache.get(f'{prefix}_generation') or 0
+    args = hashlib.md5(repr(sorted(request.args.items(multi=True))).encode()).hexdigest()
+    return f'{prefix}_{generation}_{args}'
+
+
+def _invalidate_pages(*prefixes):
+    """Drop all cached pages for the given endpoints by bumping their generation.
     
-    return jsonify({'error': 'Method not allowed'}), 405
+    The generation lives in the shared cache backend, so a bump from any worker
+    or the scheduler process moves every worker onto new keys. It starts from
+    the clock so a counter evicted and recreated never reuses a generation.
+    """
+    for prefix in prefixes:
+        generation_key = f'{prefix}_generation'
+        cache.add(generation_key, time.time_ns(), timeout=0)
+        cache.cache.inc(generation_key)
+
+
+def _is_cacheable(response):
+    """Only cache successful responses; error paths return (body, status) tuples."""
+    return not isinstance(response, tuple)
+
+
+def _dashboard_stats():
+    """Return the precomputed dashboard stats as a dict."""
+    stats = db.session.get(DashboardStats, 1)
+    if stats is None:
+        # Not computed yet (fresh database or scheduler not running)
+        stats = automation.refresh_dashboard_stats()
+    return stats.to_dict()
 
 
 @app.route('/api/stats')
+@cache.cached(timeout=60, key_prefix=STATS_CACHE_KEY, response_filter=_is_cacheable)
 def get_stats():
-    """Get dashboard statistics."""
+    """Get dashboard statistics from the precomputed stats row."""
     try:
-        active_listings = Listing.query.filter_by(is_active=True).count()
-        stale_listings = len([l for l in Listing.query.filter_by(is_active=True).all() if l.is_stale])
-        total_views = db.session.query(db.func.sum(Listing.view_count)).filter_by(is_active=True).scalar() or 0
-        total_watchers = db.session.query(db.func.sum(Listing.watch_count)).filter_by(is_active=True).scalar() or 0
-        
-        sold_items = SoldItem.query.count()
-        pending_feedback = SoldItem.query.filter_by(feedback_requested=False, feedback_received=False).count()
-        
-        recent_relists = RelistHistory.query.filter(
-            RelistHistory.relisted_at >= datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        ).count()
-        
-        recent_offers = OfferSent.query.filter(
-            OfferSent.sent_at >= datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        ).count()
-        
-        return jsonify({
-            'listings': {
-                'active': active_listings,
-                'stale': stale_listings,
-                'total_views': int(total_views),
-                'total_watchers': int(total_watchers)
-            },
-            'sales': {
-                'total_sold': sold_items,
-                'pending_feedback': pending_feedback
-            },
-            'automation': {
-                'relists_today': recent_relists,
-                'offers_today': recent_offers
-            }
-        })
+        response = ojsonify(_dashboard_stats())
+        response.cache_control.max_age = DASHBOARD_MAX_AGE
+        return response
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
+
+
+def _encode_cursor(sort_value, row_id):
+    """Encode a keyset position as an opaque URL-safe token."""
+    payload = orjson.dumps([sort_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    """Decode a token produced by _encode_cursor."""
+    try:
+        sort_value, row_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def _fetch_page(stmt, page, per_page, sort_column, id_column):
+    """Execute a Core select for one page (newest first) plus a look-ahead row.
+    
+    With ?cursor=<token> the page is located by seeking past the last row of
+    the previous page instead of using OFFSET. The total matching row count
+    is only returned when ?with_total=1 is passed.
+    """
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    base_stmt = stmt
+    cursor = request.args.get('cursor')
+    with_total = request.args.get('with_total', 0, type=int)
+    
+    if cursor:
+        sort_value, last_id = _decode_cursor(cursor)
+        stmt = stmt.where(db.or_(
+            sort_column < sort_value,
+            db.and_(sort_column == sort_value, id_column < last_id)
+        ))
+        offset = 0
+    else:
+        offset = (page - 1) * per_page
+        if with_total:
+            # count(*) OVER () is evaluated before LIMIT/OFFSET, so the page
+            # query returns the total too (a cursor's seek filter would skew it)
+            stmt = stmt.add_columns(db.func.count().over().label('total_count'))
+    
+    stmt = stmt.order_by(sort_column.desc(), id_column.desc()).offset(offset).limit(per_page + 1)
+    rows = db.session.execute(stmt).all()
+    has_more = len(rows) > per_page
+    
+    page_info = {
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more,
+        'next_cursor': _encode_cursor(getattr(rows[per_page - 1], sort_column.key), getattr(rows[per_page - 1], id_column.key)) if has_more else None
+    }
+    if with_total:
+        if rows and not cursor:
+            page_info['total'] = rows[0].total_count
+        else:
+            page_info['total'] = db.session.execute(
+                db.select(db.func.count()).select_from(base_stmt.subquery())
+            ).scalar()
+    return rows[:per_page], page_info
+
+
+def _stream_page(rows, page_info, to_item, cache_key=None):
+    """Stream {'items': [...], **page_info}, encoding one row at a time.
+    
+    Rows are converted and serialized as the response is written, so the
+    item dicts and the full JSON body are never held in memory together.
+    With cache_key, the encoded body is cached once fully written.
+    """
+    # The generator runs after the request context is gone; bind the backend now
+    backend = cache.cache if cache_key else None
+    
+    def generate():
+        chunks = []
+        
+        def emit(chunk):
+            if backend is not None:
+                chunks.append(chunk)
+            return chunk
+        
+        yield emit(b'{"items":[')
+        for i, row in enumerate(rows):
+            if i:
+                yield emit(b',')
+            yield emit(orjson.dumps(to_item(row), option=ORJSON_OPTIONS))
+        # page_info is never empty: splice its members in after the array
+        yield emit(b'],' + orjson.dumps(page_info, option=ORJSON_OPTIONS)[1:])
+        if backend is not None:
+            backend.set(cache_key, b''.join(chunks), timeout=PAGE_CACHE_TIMEOUT)
+    
+    return Response(generate(), mimetype='application/json')
+
+
+def _cached_page(cache_key):
+    """Return the cached page body for cache_key as a response, or None."""
+    body = cache.get(cache_key)
+    if body is None:
+        return None
+    return Response(body, mimetype='application/json')
 
 
 @app.route('/api/listings')
@@ -307,45 +572,35 @@ def get_listings():
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status', 'active')
         
-        query = Listing.query
+        # Select only the columns the response needs instead of full ORM rows
+        stmt = db.select(
+            Listing.id,
+            Listing.item_id,
+            Listing.title,
+            Listing.price,
+            Listing.quantity,
+            Listing.quantity_sold,
+            Listing.view_count,
+            Listing.watch_count,
+            Listing.last_updated,
+            Listing.gallery_url,
+            Listing.days_listed.label('days_listed'),
+            # Same hybrid as the status=stale filter below, so they can't drift
+            Listing.is_stale.label('is_stale')
+        )
         
         if status == 'active':
-            query = query.filter_by(is_active=True)
+            stmt = stmt.where(Listing.is_active.is_(True))
         elif status == 'stale':
-            query = query.filter_by(is_active=True)
-            listings_all = query.all()
-            stale_listings = [l for l in listings_all if l.is_stale]
-            
-            # Manual pagination for filtered results
-            start = (page - 1) * per_page
-            end = start + per_page
-            paginated = stale_listings[start:end]
-            
-            return jsonify({
-                'items': [{
-                    'item_id': l.item_id,
-                    'title': l.title,
-                    'price': l.price,
-                    'quantity': l.quantity,
-                    'view_count': l.view_count,
-                    'watch_count': l.watch_count,
-                    'days_listed': l.days_listed,
-                    'is_stale': l.is_stale,
-                    'gallery_url': l.gallery_url
-                } for l in paginated],
-                'total': len(stale_listings),
-                'page': page,
-                'per_page': per_page
-            })
+            stmt = stmt.where(Listing.is_active.is_(True), Listing.is_stale)
         elif status == 'inactive':
-            query = query.filter_by(is_active=False)
+            stmt = stmt.where(Listing.is_active.is_(False))
         
-        pagination = query.order_by(Listing.last_updated.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        listings, page_info = _fetch_page(stmt, page, per_page, Listing.last_updated, Listing.id)
         
-        return jsonify({
-            'items': [{
+        items = []
+        for l in listings:
+            items.append({
                 'item_id': l.item_id,
                 'title': l.title,
                 'price': l.price,
@@ -354,16 +609,19 @@ def get_listings():
                 'view_count': l.view_count,
                 'watch_count': l.watch_count,
                 'days_listed': l.days_listed,
-                'is_stale': l.is_stale,
+                'is_stale': bool(l.is_stale),  # NULL start_time reads as not stale
                 'gallery_url': l.gallery_url
-            } for l in pagination.items],
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page
+            })
+        
+        return ojsonify({
+            'items': items,
+            **page_info
         })
+    except ValueError as e:
+        return ojsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting listings: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/logs')
@@ -374,42 +632,51 @@ def get_logs():
         per_page = request.args.get('per_page', 50, type=int)
         action_type = request.args.get('type')
         
-        query = AutomationLog.query
+        # Core select: log rows are read-only, so skip ORM entities entirely
+        stmt = db.select(
+            AutomationLog.id,
+            AutomationLog.action_type,
+            AutomationLog.item_id,
+            AutomationLog.status,
+            AutomationLog.message,
+            AutomationLog.created_at
+        )
         
         if action_type:
-            query = query.filter_by(action_type=action_type)
+            stmt = stmt.where(AutomationLog.action_type == action_type)
         
-        pagination = query.order_by(AutomationLog.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        logs, page_info = _fetch_page(stmt, page, per_page, AutomationLog.created_at, AutomationLog.id)
         
-        return jsonify({
+        return ojsonify({
             'items': [{
                 'id': log.id,
                 'action_type': log.action_type,
                 'item_id': log.item_id,
                 'status': log.status,
                 'message': log.message,
-                'created_at': log.created_at.isoformat()
-            } for log in pagination.items],
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page
+                'created_at': log.created_at
+            } for log in logs],
+            **page_info
         })
+    except ValueError as e:
+        return ojsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting logs: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/jobs')
+@cache.cached(timeout=10, key_prefix=JOBS_CACHE_KEY, response_filter=_is_cacheable)
 def get_jobs():
-    """Get scheduled jobs status."""
+    """Get scheduled jobs status, as published by the scheduler process."""
     try:
-        jobs = scheduler.get_jobs() if scheduler else []
-        return jsonify({'jobs': jobs})
+        jobs = get_schedule()
+        response = ojsonify({'jobs': jobs})
+        response.cache_control.max_age = DASHBOARD_MAX_AGE
+        return response
     except Exception as e:
         logger.error(f"Error getting jobs: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/sync', methods=['POST'])
@@ -417,10 +684,11 @@ def manual_sync():
     """Manually trigger listing sync."""
     try:
         result = automation.sync_listings()
-        return jsonify({'success': True, 'result': result})
+        _refresh_stats()
+        return ojsonify({'success': True, 'result': result})
     except Exception as e:
         logger.error(f"Error in manual sync: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/check-stale', methods=['POST'])
@@ -428,10 +696,11 @@ def manual_stale_check():
     """Manually trigger stale listing check."""
     try:
         result = automation.check_stale_listings()
-        return jsonify({'success': True, 'result': result})
+        _refresh_stats()
+        return ojsonify({'success': True, 'result': result})
     except Exception as e:
         logger.error(f"Error in manual stale check: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/check-offers', methods=['POST'])
@@ -439,10 +708,11 @@ def manual_offer_check():
     """Manually trigger offer check."""
     try:
         result = automation.send_offers_to_watchers()
-        return jsonify({'success': True, 'result': result})
+        _refresh_stats()
+        return ojsonify({'success': True, 'result': result})
     except Exception as e:
         logger.error(f"Error in manual offer check: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/check-feedback', methods=['POST'])
@@ -450,36 +720,42 @@ def manual_feedback_check():
     """Manually trigger feedback check."""
     try:
         result = automation.request_feedback_from_buyers()
-        return jsonify({'success': True, 'result': result})
+        _refresh_stats()
+        return ojsonify({'success': True, 'result': result})
     except Exception as e:
         logger.error(f"Error in manual feedback check: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/relist/<item_id>', methods=['POST'])
 def manual_relist(item_id):
-    """Manually relist a specific item."""
+    """Queue a relist of a specific item; poll /api/relist-status/<job_id> for the result."""
     try:
-        listing = Listing.query.filter_by(item_id=item_id).first()
-        if not listing:
-            return jsonify({'success': False, 'error': 'Listing not found'}), 404
+        listing_exists = db.session.query(Listing.id).filter_by(item_id=item_id).first()
+        if not listing_exists:
+            return ojsonify({'success': False, 'error': 'Listing not found'}), 404
         
-        success = automation.ebay.relist_item(item_id)
-        
-        if success:
-            relist_record = RelistHistory(
-                listing_id=listing.id,
-                item_id=item_id,
-                reason='manual',
-                success=True
-            )
-            db.session.add(relist_record)
-            db.session.commit()
-        
-        return jsonify({'success': success})
+        # The scheduler process runs it; it may be a different process than this one
+        job_id = enqueue_job('relist', {'item_id': item_id, 'reason': 'manual'})
+        return ojsonify({'success': True, 'status': 'queued', 'job_id': job_id}), 202
     except Exception as e:
         logger.error(f"Error in manual relist: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>')
+@app.route('/api/relist-status/<job_id>')
+@app.route('/api/poshmark/scrape/<job_id>')
+def job_status(job_id):
+    """Get the status of a queued job (relist, image refresh or Poshmark scrape)."""
+    try:
+        job = get_job(job_id)
+        if not job:
+            return ojsonify({'error': 'Unknown job'}), 404
+        return ojsonify(job)
+    except Exception as e:
+        logger.error(f"Error getting job {job_id}: {e}")
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/listings/<item_id>/price', methods=['PUT'])
@@ -490,26 +766,26 @@ def update_listing_price(item_id):
         new_price = data.get('price')
         
         if not new_price or new_price <= 0:
-            return jsonify({'error': 'Invalid price'}), 400
+            return ojsonify({'error': 'Invalid price'}), 400
         
-        ebay = eBayAPI()
+        ebay = get_thread_api()
         success = ebay.update_listing_price(item_id, float(new_price))
         
         if success:
             # Update local database
-            listing = Listing.query.filter_by(item_id=item_id).first()
+            listing = Listing.get_by_item_id(item_id)
             if listing:
                 listing.price = float(new_price)
                 listing.last_updated = datetime.utcnow()
                 db.session.commit()
             
-            return jsonify({'success': True, 'message': f'Price updated to ${new_price}'})
+            return ojsonify({'success': True, 'message': f'Price updated to ${new_price}'})
         else:
-            return jsonify({'success': False, 'error': 'Failed to update price on eBay'}), 500
+            return ojsonify({'success': False, 'error': 'Failed to update price on eBay'}), 500
             
     except Exception as e:
         logger.error(f"Error updating price for item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/listings/<item_id>/quantity', methods=['PUT'])
@@ -520,26 +796,26 @@ def update_listing_quantity(item_id):
         new_quantity = data.get('quantity')
         
         if not new_quantity or new_quantity < 0:
-            return jsonify({'error': 'Invalid quantity'}), 400
+            return ojsonify({'error': 'Invalid quantity'}), 400
         
-        ebay = eBayAPI()
+        ebay = get_thread_api()
         success = ebay.update_listing_quantity(item_id, int(new_quantity))
         
         if success:
             # Update local database
-            listing = Listing.query.filter_by(item_id=item_id).first()
+            listing = Listing.get_by_item_id(item_id)
             if listing:
                 listing.quantity = int(new_quantity)
                 listing.last_updated = datetime.utcnow()
                 db.session.commit()
             
-            return jsonify({'success': True, 'message': f'Quantity updated to {new_quantity}'})
+            return ojsonify({'success': True, 'message': f'Quantity updated to {new_quantity}'})
         else:
-            return jsonify({'success': False, 'error': 'Failed to update quantity on eBay'}), 500
+            return ojsonify({'success': False, 'error': 'Failed to update quantity on eBay'}), 500
             
     except Exception as e:
         logger.error(f"Error updating quantity for item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/listings/<item_id>/update', methods=['POST'])
@@ -550,21 +826,21 @@ def update_listing_bulk(item_id):
         quantity = request.form.get('quantity', type=int)
         
         if price is None or quantity is None:
-            return jsonify({'success': False, 'error': 'Price and quantity required'}), 400
+            return ojsonify({'success': False, 'error': 'Price and quantity required'}), 400
         
         # Update price
-        ebay = eBayAPI()
+        ebay = get_thread_api()
         price_success = ebay.update_listing_price(item_id, price)
         if not price_success:
-            return jsonify({'success': False, 'error': 'Failed to update price'}), 500
+            return ojsonify({'success': False, 'error': 'Failed to update price'}), 500
         
         # Update quantity
         quantity_success = ebay.update_listing_quantity(item_id, quantity)
         if not quantity_success:
-            return jsonify({'success': False, 'error': 'Failed to update quantity'}), 500
+            return ojsonify({'success': False, 'error': 'Failed to update quantity'}), 500
         
         # Update local database
-        listing = Listing.query.filter_by(item_id=item_id).first()
+        listing = Listing.get_by_item_id(item_id)
         if listing:
             listing.price = price
             listing.quantity = quantity
@@ -576,60 +852,20 @@ def update_listing_bulk(item_id):
         
     except Exception as e:
         logger.error(f"Error updating listing {item_id}: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/refresh-images', methods=['POST'])
 def refresh_images():
-    """Refresh image URLs for all listings."""
+    """Queue an image URL refresh for all listings; poll /api/jobs/<job_id> for the result."""
     try:
-        ebay = eBayAPI()
-        automation = AutomationEngine()
-        
-        # Get all active listings
-        listings = Listing.query.filter_by(is_active=True).all()
-        
-        updated_count = 0
-        failed_count = 0
-        
-        for listing in listings:
-            try:
-                # Get fresh item details from eBay
-                item_details = ebay.get_item_details(listing.item_id)
-                
-                if item_details and 'gallery_url' in item_details:
-                    new_gallery_url = item_details['gallery_url']
-                    
-                    # Update the listing if we got a new image URL
-                    if new_gallery_url and new_gallery_url != listing.gallery_url:
-                        listing.gallery_url = new_gallery_url
-                        listing.last_updated = datetime.utcnow()
-                        updated_count += 1
-                        logger.info(f"Updated image for {listing.item_id}: {new_gallery_url}")
-                    else:
-                        logger.debug(f"No new image URL for {listing.item_id}")
-                else:
-                    logger.warning(f"Could not get item details for {listing.item_id}")
-                    failed_count += 1
-                    
-            except Exception as e:
-                logger.error(f"Error refreshing image for {listing.item_id}: {e}")
-                failed_count += 1
-        
-        # Commit all changes
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'updated': updated_count,
-            'failed': failed_count,
-            'total_processed': len(listings),
-            'message': f'Refreshed images for {updated_count} listings'
-        })
+        # One eBay call per batch of listings outlasts a request; the scheduler process runs it
+        job_id = enqueue_job('refresh_images')
+        return ojsonify({'success': True, 'status': 'queued', 'job_id': job_id}), 202
         
     except Exception as e:
         logger.error(f"Error refreshing images: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/send-offer/<item_id>', methods=['POST'])
@@ -639,26 +875,25 @@ def send_offer(item_id):
         data = request.get_json()
         discount_percent = data.get('discount_percent', 5)
         
-        automation = AutomationEngine()
         result = automation.send_offer_to_watchers(item_id, discount_percent)
         
         if result['success']:
-            return jsonify(result)
+            return ojsonify(result)
         else:
-            return jsonify(result), 400
+            return ojsonify(result), 400
             
     except Exception as e:
         logger.error(f"Error sending offer for item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/metrics', methods=['GET'])
+@cache.cached(timeout=60, key_prefix=METRICS_CACHE_KEY, response_filter=_is_cacheable)
 def get_metrics():
     """Get comprehensive seller metrics."""
     try:
         # Get basic stats
-        stats_response = get_stats()
-        stats_data = json.loads(stats_response.get_data(as_text=True))
+        stats_data = _dashboard_stats()
         
         # Calculate additional metrics
         total_views = stats_data['listings']['total_views']
@@ -680,11 +915,13 @@ def get_metrics():
             'stale_listings': stats_data['listings']['stale']
         }
         
-        return jsonify(metrics)
+        response = ojsonify(metrics)
+        response.cache_control.max_age = DASHBOARD_MAX_AGE
+        return response
         
     except Exception as e:
         logger.error(f"Error getting metrics: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/sales/recent', methods=['GET'])
@@ -711,111 +948,22 @@ def get_recent_sales():
             }
         ]
         
-        return jsonify({'sales': recent_sales})
+        return ojsonify({'sales': recent_sales})
         
     except Exception as e:
         logger.error(f"Error getting recent sales: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
-@app.route('/api/listings/<item_id>/end-relist', methods=['POST'])
-def end_and_relist_listing(item_id):
-    """End a listing and create a new one with the same details."""
-    try:
-        data = request.get_json() or {}
-        new_title = data.get('new_title')
-        new_price = data.get('new_price')
-        
-        ebay = eBayAPI()
-        result = ebay.end_and_relist_item(item_id, new_title, new_price)
-        
-        if result['success']:
-            # Update the database to reflect the change
-            listing = Listing.query.filter_by(item_id=item_id).first()
-            if listing:
-                listing.is_active = False
-                db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'message': result['message'],
-                'original_item_id': result['original_item_id'],
-                'new_item_id': result['new_item_id']
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': result['error']
-            }), 500
-            
-    except Exception as e:
-        logger.error(f"Error ending and relisting item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
-
-
-@app.route('/api/listings/<item_id>/end', methods=['POST'])
-def end_listing(item_id):
-    """End a listing."""
-    try:
-        ebay = eBayAPI()
-        success = ebay.end_listing(item_id)
-        
-        if success:
-            # Update the database
-            listing = Listing.query.filter_by(item_id=item_id).first()
-            if listing:
-                listing.is_active = False
-                db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'message': f'Successfully ended listing {item_id}'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to end listing'
-            }), 500
-            
-    except Exception as e:
-        logger.error(f"Error ending item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
-
-
-@app.route('/api/listings/<item_id>/relist', methods=['POST'])
-def relist_listing(item_id):
-    """Relist an ended listing."""
-    try:
-        ebay = eBayAPI()
-        success = ebay.relist_item(item_id)
-        
-        if success:
-            # Update the database
-            listing = Listing.query.filter_by(item_id=item_id).first()
-            if listing:
-                listing.is_active = True
-                db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'message': f'Successfully relisted item {item_id}'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to relist item'
-            }), 500
-            
-    except Exception as e:
-        logger.error(f"Error relisting item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
-
-
-        return jsonify({'sales': recent_sales})
-        
-    except Exception as e:
-        logger.error(f"Error getting recent sales: {e}")
-        return jsonify({'error': str(e)}), 500
+def _set_listing_active(item_id, active):
+    """Flip a listing's is_active flag with a single UPDATE (no SELECT or ORM load)."""
+    result = db.session.execute(
+        db.update(Listing).where(Listing.item_id == item_id).values(is_active=active)
+    )
+    db.session.commit()
+    if result.rowcount == 0:
+        logger.warning(f"Listing {item_id} not found locally; is_active not updated")
+    return result.rowcount
 
 
 @app.route('/api/listings/<item_id>/end-relist', methods=['POST'])
@@ -826,161 +974,151 @@ def end_and_relist_listing(item_id):
         new_title = data.get('new_title')
         new_price = data.get('new_price')
         
-        ebay = eBayAPI()
+        ebay = get_thread_api()
         result = ebay.end_and_relist_item(item_id, new_title, new_price)
         
         if result['success']:
             # Update the database to reflect the change
-            listing = Listing.query.filter_by(item_id=item_id).first()
-            if listing:
-                listing.is_active = False
-                db.session.commit()
+            _set_listing_active(item_id, False)
             
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'message': result['message'],
                 'original_item_id': result['original_item_id'],
                 'new_item_id': result['new_item_id']
             })
         else:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': result['error']
             }), 500
             
     except Exception as e:
         logger.error(f"Error ending and relisting item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/listings/<item_id>/end', methods=['POST'])
 def end_listing(item_id):
     """End a listing."""
     try:
-        ebay = eBayAPI()
+        ebay = get_thread_api()
         success = ebay.end_listing(item_id)
         
         if success:
             # Update the database
-            listing = Listing.query.filter_by(item_id=item_id).first()
-            if listing:
-                listing.is_active = False
-                db.session.commit()
+            _set_listing_active(item_id, False)
             
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'message': f'Successfully ended listing {item_id}'
             })
         else:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': 'Failed to end listing'
             }), 500
             
     except Exception as e:
         logger.error(f"Error ending item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/listings/<item_id>/relist', methods=['POST'])
 def relist_listing(item_id):
     """Relist an ended listing."""
     try:
-        ebay = eBayAPI()
+        ebay = get_thread_api()
         success = ebay.relist_item(item_id)
         
         if success:
             # Update the database
-            listing = Listing.query.filter_by(item_id=item_id).first()
-            if listing:
-                listing.is_active = True
-                db.session.commit()
+            _set_listing_active(item_id, True)
             
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'message': f'Successfully relisted item {item_id}'
             })
         else:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': 'Failed to relist item'
             }), 500
             
     except Exception as e:
         logger.error(f"Error relisting item {item_id}: {e}")
-        return jsonify({'error': str(e)}), 500
-
-
-if __name__ == "__main__":
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/poshmark/scrape', methods=['POST'])
 def scrape_poshmark_user():
-    """Scrape Poshmark listings from a user."""
+    """Queue a scrape of a user's Poshmark listings; poll /api/poshmark/scrape/<job_id> for the result."""
     try:
         data = request.get_json()
         username = data.get('username')
         
         if not username:
-            return jsonify({'error': 'Username required'}), 400
+            return ojsonify({'error': 'Username required'}), 400
         
-        # Scrape Poshmark listings
-        with PoshmarkScraperIntegration(headless=True) as scraper:
-            result = scraper.scrape_user_listings(username)
-        
-        return jsonify(result)
+        # A browser session takes minutes; the scheduler process runs it
+        job_id = enqueue_job('poshmark_scrape', {'username': username})
+        return ojsonify({'success': True, 'status': 'queued', 'job_id': job_id}), 202
         
     except Exception as e:
         logger.error(f"Error scraping Poshmark user: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/poshmark/listings', methods=['GET'])
 def get_poshmark_listings():
-    """Get Poshmark listings from database."""
+    """Get Poshmark listings from database, newest first."""
     try:
+        cache_key = _page_cache_key(POSHMARK_PAGES_CACHE_KEY)
+        cached = _cached_page(cache_key)
+        if cached is not None:
+            return cached
+        
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        pagination = PoshmarkListing.query.paginate(
-            page=page, per_page=per_page, error_out=False
+        # has_draft comes back as a correlated EXISTS instead of lazy-loading drafts per row
+        has_draft = db.exists().where(
+            EbayDraft.poshmark_listing_id == PoshmarkListing.id
+        ).correlate(PoshmarkListing).label('has_draft')
+        stmt = db.select(
+            PoshmarkListing.id,
+            PoshmarkListing.poshmark_id,
+            PoshmarkListing.poshmark_url,
+            PoshmarkListing.title,
+            PoshmarkListing.price,
+            PoshmarkListing.original_price,
+            PoshmarkListing.description,
+            PoshmarkListing.brand,
+            PoshmarkListing.size,
+            PoshmarkListing.category,
+            PoshmarkListing.condition,
+            PoshmarkListing.seller_username,
+            PoshmarkListing.images,
+            PoshmarkListing.tags,
+            PoshmarkListing.scraped_at,
+            has_draft
         )
         
-        listings = []
-        for listing in pagination.items:
-            images = json.loads(listing.images) if listing.images else []
-            tags = json.loads(listing.tags) if listing.tags else []
-            
-            listings.append({
-                'id': listing.id,
-                'poshmark_id': listing.poshmark_id,
-                'poshmark_url': listing.poshmark_url,
-                'title': listing.title,
-                'price': listing.price,
-                'original_price': listing.original_price,
-                'description': listing.description,
-                'brand': listing.brand,
-                'size': listing.size,
-                'category': listing.category,
-                'condition': listing.condition,
-                'seller_username': listing.seller_username,
-                'images': images,
-                'tags': tags,
-                'scraped_at': listing.scraped_at.isoformat() if listing.scraped_at else None,
-                'has_draft': len(listing.ebay_drafts) > 0
-            })
+        rows, page_info = _fetch_page(stmt, page, per_page, PoshmarkListing.scraped_at, PoshmarkListing.id)
         
-        return jsonify({
-            'items': listings,
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': pagination.pages
-        })
+        def to_item(listing):
+            item = listing._asdict()
+            item['images'] = listing.images or []
+            item['tags'] = listing.tags or []
+            return item
         
+        return _stream_page(rows, page_info, to_item, cache_key=cache_key)
+        
+    except ValueError as e:
+        return ojsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting Poshmark listings: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/poshmark/create-drafts', methods=['POST'])
@@ -991,107 +1129,140 @@ def create_ebay_drafts_from_poshmark():
         listing_ids = data.get('listing_ids', [])
         
         if not listing_ids:
-            return jsonify({'error': 'Listing IDs required'}), 400
+            return ojsonify({'error': 'Listing IDs required'}), 400
         
         # Create drafts
         with PoshmarkScraperIntegration() as scraper:
             result = scraper.create_ebay_drafts_from_poshmark(listing_ids)
+        # New drafts also flip has_draft on the Poshmark listings
+        _invalidate_pages(POSHMARK_PAGES_CACHE_KEY, DRAFTS_PAGES_CACHE_KEY)
         
-        return jsonify(result)
+        return ojsonify(result)
         
     except Exception as e:
         logger.error(f"Error creating Poshmark drafts: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return ojsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/drafts', methods=['GET'])
 def get_ebay_drafts():
-    """Get eBay drafts from database."""
+    """Get eBay drafts from database, newest first."""
     try:
+        cache_key = _page_cache_key(DRAFTS_PAGES_CACHE_KEY)
+        cached = _cached_page(cache_key)
+        if cached is not None:
+            return cached
+        
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status', 'draft')
         
-        query = EbayDraft.query
+        # Poshmark title is joined in rather than lazy-loaded per draft
+        stmt = db.select(
+            EbayDraft.id,
+            EbayDraft.poshmark_listing_id,
+            EbayDraft.ebay_item_id,
+            EbayDraft.title,
+            EbayDraft.description,
+            EbayDraft.price,
+            EbayDraft.quantity,
+            EbayDraft.category_id,
+            EbayDraft.condition_id,
+            EbayDraft.condition_description,
+            EbayDraft.images,
+            EbayDraft.location,
+            EbayDraft.listing_duration,
+            EbayDraft.listing_type,
+            EbayDraft.status,
+            EbayDraft.error_message,
+            EbayDraft.created_at,
+            EbayDraft.published_at,
+            PoshmarkListing.title.label('poshmark_title')
+        ).outerjoin(PoshmarkListing, EbayDraft.poshmark_listing_id == PoshmarkListing.id)
         if status:
-            query = query.filter_by(status=status)
+            stmt = stmt.where(EbayDraft.status == status)
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        rows, page_info = _fetch_page(stmt, page, per_page, EbayDraft.created_at, EbayDraft.id)
         
-        drafts = []
-        for draft in pagination.items:
-            images = json.loads(draft.images) if draft.images else []
-            
-            drafts.append({
-                'id': draft.id,
-                'poshmark_listing_id': draft.poshmark_listing_id,
-                'ebay_item_id': draft.ebay_item_id,
-                'title': draft.title,
-                'description': draft.description,
-                'price': draft.price,
-                'quantity': draft.quantity,
-                'category_id': draft.category_id,
-                'condition_id': draft.condition_id,
-                'condition_description': draft.condition_description,
-                'images': images,
-                'location': draft.location,
-                'listing_duration': draft.listing_duration,
-                'listing_type': draft.listing_type,
-                'status': draft.status,
-                'error_message': draft.error_message,
-                'created_at': draft.created_at.isoformat() if draft.created_at else None,
-                'published_at': draft.published_at.isoformat() if draft.published_at else None,
-                'poshmark_title': draft.poshmark_listing.title if draft.poshmark_listing else None
-            })
+        def to_item(draft):
+            item = draft._asdict()
+            item['images'] = draft.images or []
+            return item
         
-        return jsonify({
-            'items': drafts,
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': pagination.pages
-        })
+        return _stream_page(rows, page_info, to_item, cache_key=cache_key)
         
+    except ValueError as e:
+        return ojsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting eBay drafts: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
+
+
+def _draft_price(value):
+    """Coerce a draft price to whole cents; must be positive."""
+    price = round(float(value), 2)
+    if price <= 0:
+        raise ValueError('price must be positive')
+    return price
+
+
+def _draft_quantity(value):
+    """Coerce a draft quantity; must be a non-negative whole number."""
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError('quantity must be a whole number')
+    quantity = int(value)
+    if quantity < 0:
+        raise ValueError('quantity cannot be negative')
+    return quantity
+
+
+# Draft fields the editor may change, with the coercion applied to each (None = as sent)
+DRAFT_UPDATE_FIELDS = {
+    'title': None,
+    'description': None,
+    'price': _draft_price,
+    'quantity': _draft_quantity,
+    'category_id': None,
+    'condition_id': None,
+    'condition_description': None,
+    'images': None,
+}
+
+
+def _draft_update_values(data):
+    """Pick and coerce the editable draft fields from a decoded request body."""
+    if not isinstance(data, dict):
+        raise TypeError('expected a JSON object')
+    return {
+        field: coerce(data[field]) if coerce else data[field]
+        for field, coerce in DRAFT_UPDATE_FIELDS.items()
+        if field in data
+    }
 
 
 @app.route('/api/drafts/<int:draft_id>/update', methods=['PUT'])
 def update_ebay_draft(draft_id):
     """Update an eBay draft."""
     try:
-        data = request.get_json()
-        
-        draft = EbayDraft.query.get(draft_id)
-        if not draft:
-            return jsonify({'error': 'Draft not found'}), 404
-        
-        # Update fields
-        if 'title' in data:
-            draft.title = data['title']
-        if 'description' in data:
-            draft.description = data['description']
-        if 'price' in data:
-            draft.price = float(data['price'])
-        if 'quantity' in data:
-            draft.quantity = int(data['quantity'])
-        if 'category_id' in data:
-            draft.category_id = data['category_id']
-        if 'condition_id' in data:
-            draft.condition_id = data['condition_id']
-        if 'condition_description' in data:
-            draft.condition_description = data['condition_description']
-        if 'images' in data:
-            draft.images = json.dumps(data['images'])
-        
-        draft.last_updated = datetime.utcnow()
+        try:
+            values = _draft_update_values(orjson.loads(request.get_data()))
+        except (ValueError, TypeError) as e:
+            return ojsonify({'error': f'Invalid draft update: {e}'}), 400
+        
+        # One UPDATE instead of loading the draft first; rowcount tells us if it exists
+        updated = db.session.execute(
+            db.update(EbayDraft)
+            .where(EbayDraft.id == draft_id)
+            .values(**values, last_updated=datetime.utcnow())
+        ).rowcount
+        if not updated:
+            db.session.rollback()
+            return ojsonify({'error': 'Draft not found'}), 404
         
         db.session.commit()
+        _invalidate_pages(DRAFTS_PAGES_CACHE_KEY)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'message': f'Draft {draft_id} updated successfully'
         })
@@ -1099,64 +1270,98 @@ def update_ebay_draft(draft_id):
     except Exception as e:
         logger.error(f"Error updating draft {draft_id}: {e}")
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/drafts/<int:draft_id>/publish', methods=['POST'])
 def publish_ebay_draft(draft_id):
     """Publish an eBay draft to create a live listing."""
     try:
-        draft = EbayDraft.query.get(draft_id)
-        if not draft:
-            return jsonify({'error': 'Draft not found'}), 404
-        
-        if draft.status != 'draft':
-            return jsonify({'error': 'Draft is not in draft status'}), 400
+        # Claim the draft and read what eBay needs in one UPDATE ... RETURNING,
+        # and commit before calling eBay, so no transaction (or pooled
+        # connection) is held open across the HTTP round trip and a concurrent
+        # publish of the same draft is rejected. The claim time is
+        # last_updated: a 'publishing' claim older than the timeout was
+        # abandoned (no request outlives the worker timeout) and can be retaken.
+        now = datetime.utcnow()
+        claim_expired_before = now - timedelta(minutes=Config.PUBLISH_CLAIM_TIMEOUT_MINUTES)
+        draft = db.session.execute(
+            db.update(EbayDraft)
+            .where(
+                EbayDraft.id == draft_id,
+                db.or_(
+                    EbayDraft.status == 'draft',
+                    db.and_(EbayDraft.status == 'publishing', EbayDraft.last_updated < claim_expired_before)
+                )
+            )
+            .values(status='publishing', last_updated=now)
+            .returning(
+                EbayDraft.title,
+                EbayDraft.description,
+                EbayDraft.price,
+                EbayDraft.quantity,
+                EbayDraft.category_id,
+                EbayDraft.condition_id,
+                EbayDraft.condition_description,
+                EbayDraft.images,
+                EbayDraft.location,
+                EbayDraft.listing_duration,
+                EbayDraft.listing_type
+            )
+        ).first()
+        db.session.commit()
+        if draft is None:
+            status = db.session.scalar(db.select(EbayDraft.status).where(EbayDraft.id == draft_id))
+            if status is None:
+                return ojsonify({'error': 'Draft not found'}), 404
+            if status == 'publishing':
+                return ojsonify({'error': 'Draft is already being published'}), 409
+            return ojsonify({'error': 'Draft is not in draft status'}), 400
+        _invalidate_pages(DRAFTS_PAGES_CACHE_KEY)
         
         # Convert draft to eBay listing format
-        images = json.loads(draft.images) if draft.images else []
-        
-        listing_data = {
-            'title': draft.title,
-            'description': draft.description,
-            'price': draft.price,
-            'quantity': draft.quantity,
-            'category_id': draft.category_id,
-            'condition_id': draft.condition_id,
-            'condition_description': draft.condition_description,
-            'images': images,
-            'location': draft.location,
-            'listing_duration': draft.listing_duration,
-            'listing_type': draft.listing_type
-        }
+        listing_data = draft._asdict()
+        listing_data['images'] = draft.images or []
         
         # Create listing via eBay API
-        ebay = eBayAPI()
-        result = ebay.create_listing(listing_data)
+        try:
+            ebay = get_thread_api()
+            result = ebay.create_listing(listing_data)
+        except Exception as e:
+            logger.error(f"eBay error publishing draft {draft_id}: {e}")
+            result = {'success': False, 'error': str(e)}
         
+        # Short transaction to record the outcome (no need to reload the draft)
+        outcome = db.update(EbayDraft).where(EbayDraft.id == draft_id)
         if result.get('success'):
             # Update draft status
-            draft.status = 'published'
-            draft.ebay_item_id = result.get('item_id')
-            draft.published_at = datetime.utcnow()
-            draft.last_updated = datetime.utcnow()
+            db.session.execute(outcome.values(
+                status='published',
+                ebay_item_id=result.get('item_id'),
+                published_at=datetime.utcnow(),
+                last_updated=datetime.utcnow()
+            ))
             
             db.session.commit()
+            _invalidate_pages(DRAFTS_PAGES_CACHE_KEY)
             
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'message': f'Draft {draft_id} published successfully',
                 'item_id': result.get('item_id')
             })
         else:
             # Update draft with error
-            draft.status = 'failed'
-            draft.error_message = result.get('error', 'Unknown error')
-            draft.last_updated = datetime.utcnow()
+            db.session.execute(outcome.values(
+                status='failed',
+                error_message=result.get('error', 'Unknown error'),
+                last_updated=datetime.utcnow()
+            ))
             
             db.session.commit()
+            _invalidate_pages(DRAFTS_PAGES_CACHE_KEY)
             
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': result.get('error', 'Failed to publish draft')
             }), 500
@@ -1164,7 +1369,7 @@ def publish_ebay_draft(draft_id):
     except Exception as e:
         logger.error(f"Error publishing draft {draft_id}: {e}")
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/api/shipping/labels', methods=['POST'])
@@ -1175,11 +1380,11 @@ def generate_shipping_labels():
         item_ids = data.get('item_ids', [])
         
         if not item_ids:
-            return jsonify({'error': 'Item IDs required'}), 400
+            return ojsonify({'error': 'Item IDs required'}), 400
         
         # Placeholder for shipping label generation
         # Would integrate with shipping APIs like ShipStation, EasyPost, etc.
-        return jsonify({
+        return ojsonify({
             'success': True,
             'labels_generated': len(item_ids),
             'message': f'Generated {len(item_ids)} shipping labels'
@@ -1187,7 +1392,7 @@ def generate_shipping_labels():
         
     except Exception as e:
         logger.error(f"Error generating shipping labels: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 if __name__ == '__main__':
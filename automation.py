@@ -1,164 +1,273 @@
 """Automation rules engine for eBay store management."""
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from typing import List, Dict
-import json
+import orjson
 
-from models import db, Listing, RelistHistory, OfferSent, SoldItem, AutomationLog
-from ebay_api import eBayAPI
+from models import db, Listing, RelistHistory, OfferSent, SoldItem, AutomationLog, DashboardStats
+from ebay_api import eBayAPI, get_thread_api
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Max ids per IN (...) list; SQLite caps bound parameters per statement
+SQL_IN_CHUNK_SIZE = 500
+
 
 class AutomationEngine:
     """Manages automated tasks for eBay store."""
     
-    def __init__(self):
-        """Initialize automation engine."""
-        self.ebay = eBayAPI()
+    @property
+    def ebay(self) -> eBayAPI:
+        """eBay client for the calling thread; the engine itself is shared across threads."""
+        return get_thread_api()
     
     def sync_listings(self) -> Dict:
         """Sync active listings from eBay to local database."""
         logger.info("Starting listing sync...")
         
         try:
-            # Get listings from eBay
-            ebay_listings = self.ebay.get_active_listings()
-            
             stats = {
-                'total': len(ebay_listings),
+                'total': 0,
                 'new': 0,
                 'updated': 0,
                 'deactivated': 0
             }
             
+            # One query for what we already have, instead of a SELECT per listing;
+            # the synced columns are included so unchanged rows can be skipped
+            known = {
+                row.item_id: row
+                for row in db.session.execute(db.select(
+                    Listing.id, Listing.item_id, Listing.title, Listing.price,
+                    Listing.quantity, Listing.quantity_sold, Listing.view_count,
+                    Listing.watch_count, Listing.is_active
+                ))
+            }
+            
             # Track item IDs from eBay
             ebay_item_ids = set()
             
-            for listing_data in ebay_listings:
-                ebay_item_ids.add(listing_data['item_id'])
-                
-                # Check if listing exists
-                listing = Listing.query.filter_by(item_id=listing_data['item_id']).first()
-                
-                if listing:
-                    # Update existing listing
-                    listing.title = listing_data['title']
-                    listing.price = listing_data['price']
-                    listing.quantity = listing_data['quantity']
-                    listing.quantity_sold = listing_data['quantity_sold']
-                    listing.view_count = listing_data['view_count']
-                    listing.watch_count = listing_data['watch_count']
-                    listing.is_active = True
-                    stats['updated'] += 1
-                else:
-                    # Create new listing
-                    listing = Listing(
-                        item_id=listing_data['item_id'],
-                        title=listing_data['title'],
-                        sku=listing_data['sku'],
-                        price=listing_data['price'],
-                        quantity=listing_data['quantity'],
-                        quantity_sold=listing_data['quantity_sold'],
-                        listing_type=listing_data['listing_type'],
-                        start_time=datetime.fromisoformat(listing_data['start_time'].replace('Z', '+00:00')) if listing_data['start_time'] else None,
-                        end_time=datetime.fromisoformat(listing_data['end_time'].replace('Z', '+00:00')) if listing_data['end_time'] else None,
-                        view_count=listing_data['view_count'],
-                        watch_count=listing_data['watch_count'],
-                        condition=listing_data['condition'],
-                        gallery_url=listing_data['gallery_url'],
-                        is_active=True
-                    )
-                    db.session.add(listing)
-                    stats['new'] += 1
-            
-            # Deactivate listings that are no longer active on eBay
-            active_listings = Listing.query.filter_by(is_active=True).all()
-            for listing in active_listings:
-                if listing.item_id not in ebay_item_ids:
-                    listing.is_active = False
-                    stats['deactivated'] += 1
+            # Upsert each page as it arrives (the next page downloads meanwhile);
+            # a failed page raises, so nothing below deactivates on partial data
+            for page in self._prefetched(self.ebay.iter_active_listings()):
+                stats['total'] += len(page)
+                self._upsert_listing_page(page, known, ebay_item_ids, stats)
+                db.session.commit()
+            
+            # Deactivate listings that are no longer active on eBay with one
+            # UPDATE per chunk of ids (chunked to stay under SQLite's bound-parameter limit)
+            deactivate_ids = [
+                row.id for item_id, row in known.items()
+                if row.is_active and item_id not in ebay_item_ids
+            ]
+            for start in range(0, len(deactivate_ids), SQL_IN_CHUNK_SIZE):
+                result = db.session.execute(
+                    db.update(Listing)
+                    .where(Listing.id.in_(deactivate_ids[start:start + SQL_IN_CHUNK_SIZE]))
+                    .values(is_active=False)
+                )
+                stats['deactivated'] += result.rowcount
             
+            self._log_automation('sync_listings', None, 'success', 
+                               f"Synced {stats['total']} listings", orjson.dumps(stats).decode())
             db.session.commit()
             
             logger.info(f"Listing sync complete: {stats}")
-            self._log_automation('sync_listings', None, 'success', 
-                               f"Synced {stats['total']} listings", json.dumps(stats))
             
             return stats
             
         except Exception as e:
             logger.error(f"Error syncing listings: {e}")
-            self._log_automation('sync_listings', None, 'failed', str(e))
+            self._log_failure('sync_listings', None, str(e))
             return {'error': str(e)}
     
+    def _upsert_listing_page(self, page: List[Dict], known: Dict, ebay_item_ids: set, stats: Dict):
+        """Write one page of eBay listings: executemany UPDATE by primary key plus a multi-row INSERT.
+        
+        Only listings whose synced values changed are updated, so an
+        unchanged row keeps its last_updated (which orders the listing pages).
+        """
+        update_rows = []
+        insert_rows = []
+        
+        for listing_data in page:
+            item_id = listing_data['item_id']
+            if item_id in ebay_item_ids:
+                continue
+            ebay_item_ids.add(item_id)
+            
+            existing = known.get(item_id)
+            if existing:
+                # Update existing listing
+                values = {
+                    'title': listing_data['title'],
+                    'price': listing_data['price'],
+                    'quantity': listing_data['quantity'],
+                    'quantity_sold': listing_data['quantity_sold'],
+                    'view_count': listing_data['view_count'],
+                    'watch_count': listing_data['watch_count'],
+                    'is_active': True
+                }
+                if any(getattr(existing, key) != value for key, value in values.items()):
+                    update_rows.append({'id': existing.id, **values})
+                stats['updated'] += 1
+            else:
+                # Create new listing
+                insert_rows.append({
+                    'item_id': item_id,
+                    'title': listing_data['title'],
+                    'sku': listing_data['sku'],
+                    'price': listing_data['price'],
+                    'quantity': listing_data['quantity'],
+                    'quantity_sold': listing_data['quantity_sold'],
+                    'listing_type': listing_data['listing_type'],
+                    'start_time': self._parse_ebay_datetime(listing_data['start_time']),
+                    'end_time': self._parse_ebay_datetime(listing_data['end_time']),
+                    'view_count': listing_data['view_count'],
+                    'watch_count': listing_data['watch_count'],
+                    'condition': listing_data['condition'],
+                    'gallery_url': listing_data['gallery_url'],
+                    'is_active': True
+                })
+                stats['new'] += 1
+        
+        if update_rows:
+            db.session.execute(db.update(Listing), update_rows)
+        self._bulk_insert(Listing, insert_rows)
+    
+    @staticmethod
+    def _prefetched(pages):
+        """Yield from a page iterator while the following page is fetched in a background thread."""
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(next, pages, None)
+            while True:
+                page = future.result()
+                if page is None:
+                    return
+                future = executor.submit(next, pages, None)
+                yield page
+    
+    @staticmethod
+    def _parse_ebay_datetime(value):
+        """Parse an eBay ISO 8601 timestamp ('...Z'); datetimes already parsed by ebaysdk and empty values pass through."""
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            return value
+        # Python 3.11's C fromisoformat accepts the trailing 'Z' directly
+        return datetime.fromisoformat(value)
+    
+    @staticmethod
+    def _latest_for_listing(item_id_column, timestamp_column):
+        """Correlated MAX(timestamp) for the outer Listing row's item_id, served by the (item_id, timestamp) index."""
+        return db.select(db.func.max(timestamp_column)).where(
+            item_id_column == Listing.item_id
+        ).scalar_subquery()
+    
+    @staticmethod
+    def _compute_offer_price(price: float, discount_percent: float) -> float:
+        """Price after taking discount_percent off."""
+        return price * (1.0 - discount_percent * 0.01)
+    
+    @staticmethod
+    def _last_offer_at(item_id: str):
+        """Latest OfferSent.sent_at for one item, read straight from ix_offers_sent_item_sent."""
+        return db.session.scalar(
+            db.select(db.func.max(OfferSent.sent_at)).where(OfferSent.item_id == item_id)
+        )
+    
     def check_stale_listings(self) -> Dict:
         """Identify and optionally relist stale listings."""
         logger.info("Checking for stale listings...")
         
         try:
-            stale_listings = []
-            
-            # Find active listings that are stale
-            listings = Listing.query.filter_by(is_active=True).all()
+            # Find active listings that are stale, filtered in SQL:
+            # 1. Older than 45 days without a sale (regardless of views)
+            # 2. OR older than 30 days AND have low views (less than 10 views)
+            # Only the columns the checks and the summaries read, plus each
+            # listing's last relist time in the same round trip
+            now = datetime.utcnow()
+            stale_listings = db.session.execute(
+                db.select(
+                    Listing.id, Listing.item_id, Listing.title, Listing.price,
+                    Listing.quantity, Listing.quantity_sold, Listing.view_count,
+                    Listing.watch_count, Listing.start_time, Listing.gallery_url,
+                    self._latest_for_listing(
+                        RelistHistory.item_id, RelistHistory.relisted_at
+                    ).label('last_relisted_at')
+                ).where(
+                    Listing.is_active.is_(True),
+                    db.or_(
+                        db.and_(Listing.start_time <= now - timedelta(days=45), Listing.quantity_sold == 0),
+                        db.and_(Listing.start_time <= now - timedelta(days=30), Listing.view_count < 10)
+                    )
+                )
+            ).all()
             
-            for listing in listings:
-                # Use start_time field to calculate age
-                if listing.start_time:
-                    days_since_created = (datetime.utcnow() - listing.start_time).days
-                    
-                    # Consider listings stale if they are:
-                    # 1. Older than 45 days without a sale (regardless of views)
-                    # 2. OR older than 30 days AND have low views (less than 10 views)
-                    
-                    is_stale_no_sale = (days_since_created >= 45 and listing.sold_count == 0)
-                    is_old_low_traffic = (days_since_created >= 30 and listing.view_count < 10)
-                    
-                    if is_stale_no_sale or is_old_low_traffic:
-                        stale_listings.append(listing)
-                        logger.info(f"Found stale listing: {listing.item_id} - {days_since_created} days old, {listing.view_count} views, {listing.sold_count} sales")
+            # Age each listing once and build its summary in the same pass
+            stale_summaries = []
+            for listing in stale_listings:
+                days_listed = (now - listing.start_time).days if listing.start_time else 0
+                logger.info(f"Found stale listing: {listing.item_id} - {days_listed} days old, {listing.view_count} views, {listing.quantity_sold} sales")
+                
+                if days_listed >= 30 and listing.view_count < 10:
+                    reason = 'old_low_traffic'
+                elif days_listed >= 60:
+                    reason = 'very_old'
+                else:
+                    reason = 'definitely_stale'
+                stale_summaries.append({
+                    'item_id': listing.item_id,
+                    'title': listing.title,
+                    'price': listing.price,
+                    'quantity': listing.quantity,
+                    'view_count': listing.view_count,
+                    'watch_count': listing.watch_count,
+                    'days_listed': days_listed,
+                    'gallery_url': listing.gallery_url,
+                    'reason': reason
+                })
             
             logger.info(f"Found {len(stale_listings)} stale listings")
             
             relisted_count = 0
             failed_count = 0
-            
+            relist_rows = []
+            log_rows = []
+            to_relist = []
+            relist_cutoff = now - timedelta(days=7)
             for listing in stale_listings:
                 # Check if we've already relisted recently (within 7 days)
-                recent_relist = RelistHistory.query.filter_by(
-                    item_id=listing.item_id
-                ).order_by(RelistHistory.relisted_at.desc()).first()
-                
-                if recent_relist:
-                    days_since_relist = (datetime.utcnow() - recent_relist.relisted_at).days
-                    if days_since_relist < 7:
-                        logger.info(f"Skipping {listing.item_id} - relisted {days_since_relist} days ago")
-                        continue
-                
-                # Attempt to end and relist (gives fresh algorithm boost)
-                result = self.ebay.end_and_relist_item(listing.item_id)
-                
+                if listing.last_relisted_at and listing.last_relisted_at > relist_cutoff:
+                    logger.info(f"Skipping {listing.item_id} - relisted {(now - listing.last_relisted_at).days} days ago")
+                    continue
+                to_relist.append(listing)
+            
+            for listing, result in self._end_and_relist_all(to_relist):
                 # Record the relist attempt
-                relist_record = RelistHistory(
-                    listing_id=listing.id,
-                    item_id=listing.item_id,
-                    reason='stale_listing_end_relist',
-                    success=result['success'],
-                    error_message=None if result['success'] else result.get('error', 'End and relist failed'),
-                    new_item_id=result.get('new_item_id') if result['success'] else None
-                )
-                db.session.add(relist_record)
+                relist_rows.append({
+                    'listing_id': listing.id,
+                    'item_id': listing.item_id,
+                    'reason': 'stale_listing_end_relist',
+                    'success': result['success'],
+                    'error_message': None if result['success'] else result.get('error', 'End and relist failed'),
+                    'new_item_id': result.get('new_item_id') if result['success'] else None
+                })
                 
                 if result['success']:
                     relisted_count += 1
-                    self._log_automation('end_relist', listing.item_id, 'success',
-                                       f"Ended and relisted stale item: {listing.title} -> {result['new_item_id']}")
+                    log_rows.append(self._log_row('end_relist', listing.item_id, 'success',
+                                                  f"Ended and relisted stale item: {listing.title} -> {result['new_item_id']}"))
                 else:
                     failed_count += 1
-                    self._log_automation('end_relist', listing.item_id, 'failed',
-                                       f"Failed to end and relist: {listing.title} - {result.get('error', 'Unknown error')}")
+                    log_rows.append(self._log_row('end_relist', listing.item_id, 'failed',
+                                                  f"Failed to end and relist: {listing.title} - {result.get('error', 'Unknown error')}"))
             
+            # Write all relist records and log entries in one transaction
+            self._bulk_insert(RelistHistory, relist_rows)
+            self._bulk_insert(AutomationLog, log_rows)
             db.session.commit()
             
             result = {
@@ -166,21 +275,7 @@ class AutomationEngine:
                 'stale_count': len(stale_listings),
                 'relisted': relisted_count,
                 'failed': failed_count,
-                'listings': [
-                    {
-                        'item_id': listing.item_id,
-                        'title': listing.title,
-                        'price': listing.price,
-                        'quantity': listing.quantity,
-                        'view_count': listing.view_count,
-                        'watch_count': listing.watch_count,
-                        'days_listed': (datetime.utcnow() - listing.start_time).days if listing.start_time else 0,
-                        'gallery_url': listing.gallery_url,
-                        'reason': 'old_low_traffic' if (datetime.utcnow() - listing.start_time).days >= 30 and listing.view_count < 10 else 
-                                 'very_old' if (datetime.utcnow() - listing.start_time).days >= 60 else 'definitely_stale'
-                    }
-                    for listing in stale_listings
-                ]
+                'listings': stale_summaries
             }
             
             logger.info(f"Stale listing check complete: {result}")
@@ -188,7 +283,7 @@ class AutomationEngine:
             
         except Exception as e:
             logger.error(f"Error checking stale listings: {e}")
-            self._log_automation('check_stale', None, 'failed', str(e))
+            self._log_failure('check_stale', None, str(e))
             return {
                 'success': False,
                 'error': str(e),
@@ -205,52 +300,66 @@ class AutomationEngine:
         try:
             offers_sent = 0
             failed_count = 0
-            
-            # Find listings with watchers but few sales
-            listings = Listing.query.filter(
-                Listing.is_active == True,
-                Listing.watch_count >= 2,
-                Listing.quantity_sold == 0
+            offer_rows = []
+            log_rows = []
+            
+            # Find listings with watchers but few sales (only the columns used
+            # below, plus each listing's last offer time)
+            listings = db.session.execute(
+                db.select(
+                    Listing.id, Listing.item_id, Listing.title, Listing.price,
+                    Listing.quantity, Listing.view_count, Listing.watch_count,
+                    Listing.days_listed.label('days_listed'), Listing.gallery_url,
+                    self._latest_for_listing(OfferSent.item_id, OfferSent.sent_at).label('last_offered_at')
+                ).where(
+                    Listing.is_active.is_(True),
+                    Listing.watch_count >= 2,
+                    Listing.quantity_sold == 0
+                )
             ).all()
             
             logger.info(f"Found {len(listings)} listings with watchers")
             
+            now = datetime.utcnow()
+            offer_cutoff = now - timedelta(days=14)
+            discount_pct = Config.OFFER_DISCOUNT_PERCENT
+            discount_multiplier = self._compute_offer_price(1.0, discount_pct)
+            offer_message = f"Special {discount_pct}% off!"
+            
             for listing in listings:
                 # Check if we've sent an offer recently (within 14 days)
-                recent_offer = OfferSent.query.filter_by(
-                    item_id=listing.item_id
-                ).order_by(OfferSent.sent_at.desc()).first()
+                last_offered_at = listing.last_offered_at
                 
-                if recent_offer:
-                    days_since_offer = (datetime.utcnow() - recent_offer.sent_at).days
-                    if days_since_offer < 14:
-                        logger.info(f"Skipping {listing.item_id} - offer sent {days_since_offer} days ago")
-                        continue
+                if last_offered_at and last_offered_at > offer_cutoff:
+                    logger.info(f"Skipping {listing.item_id} - offer sent {(now - last_offered_at).days} days ago")
+                    continue
                 
                 # Calculate offer price
-                discount = Config.OFFER_DISCOUNT_PERCENT / 100
-                offer_price = listing.price * (1 - discount)
+                offer_price = listing.price * discount_multiplier
                 
                 # Note: eBay API has limitations on sending offers to specific buyers
                 # This is more of a tracking mechanism. You may need to use eBay's
                 # promotional tools in the actual UI or through their marketing APIs
                 
                 # Record the offer (even if not actually sent via API)
-                offer_record = OfferSent(
-                    listing_id=listing.id,
-                    item_id=listing.item_id,
-                    offer_price=offer_price,
-                    original_price=listing.price,
-                    discount_percent=Config.OFFER_DISCOUNT_PERCENT,
-                    message=f"Special {Config.OFFER_DISCOUNT_PERCENT}% off!",
-                    success=True  # Mark as success for tracking
-                )
-                db.session.add(offer_record)
+                offer_rows.append({
+                    'listing_id': listing.id,
+                    'item_id': listing.item_id,
+                    'offer_price': offer_price,
+                    'original_price': listing.price,
+                    'discount_percent': discount_pct,
+                    'message': offer_message,
+                    'sent_at': now,
+                    'success': True  # Mark as success for tracking
+                })
                 offers_sent += 1
                 
-                self._log_automation('offer', listing.item_id, 'success',
-                                   f"Offer opportunity identified: {listing.title} - ${offer_price:.2f}")
+                log_rows.append(self._log_row('offer', listing.item_id, 'success',
+                                              f"Offer opportunity identified: {listing.title} - ${offer_price:.2f}"))
             
+            # Write all offer records and log entries in one transaction
+            self._bulk_insert(OfferSent, offer_rows)
+            self._bulk_insert(AutomationLog, log_rows)
             db.session.commit()
             
             result = {
@@ -278,13 +387,13 @@ class AutomationEngine:
             
         except Exception as e:
             logger.error(f"Error sending offers: {e}")
-            self._log_automation('send_offers', None, 'failed', str(e))
+            self._log_failure('send_offers', None, str(e))
             return {'error': str(e)}
     
     def send_offer_to_watchers(self, item_id: str, discount_percent: float = 5) -> Dict:
         """Send a promotional offer for a specific listing with smart cooldown tracking."""
         try:
-            listing = Listing.query.filter_by(item_id=item_id).first()
+            listing = Listing.get_by_item_id(item_id)
             if not listing:
                 return {'success': False, 'error': 'Listing not found'}
             
@@ -292,23 +401,18 @@ class AutomationEngine:
             if listing.watch_count == 0:
                 return {'success': False, 'error': 'No watchers for this listing'}
             
-            # Calculate offer price
-            discount = discount_percent / 100
-            offer_price = listing.price * (1 - discount)
-            
             # Check if we've sent an offer recently (within 14 days)
-            recent_offer = OfferSent.query.filter_by(
-                item_id=listing.item_id
-            ).order_by(OfferSent.sent_at.desc()).first()
+            now = datetime.utcnow()
+            last_offered_at = self._last_offer_at(listing.item_id)
             
-            if recent_offer:
-                days_since_offer = (datetime.utcnow() - recent_offer.sent_at).days
+            if last_offered_at:
+                days_since_offer = (now - last_offered_at).days
                 if days_since_offer < 14:
                     return {
                         'success': False, 
                         'error': f'Offer sent {days_since_offer} days ago',
                         'cooldown_remaining': 14 - days_since_offer,
-                        'last_offer_date': recent_offer.sent_at.isoformat()
+                        'last_offer_date': last_offered_at
                     }
             
             # Check if listing meets minimum criteria for offers
@@ -318,6 +422,9 @@ class AutomationEngine:
                     'error': f'Listing has insufficient views ({listing.view_count} < {Config.MIN_VIEWS_FOR_OFFER})'
                 }
             
+            # Calculate offer price
+            offer_price = self._compute_offer_price(listing.price, discount_percent)
+            
             # Record the offer attempt
             offer_record = OfferSent(
                 listing_id=listing.id,
@@ -327,13 +434,12 @@ class AutomationEngine:
                 discount_percent=discount_percent,
                 message=f"Special {discount_percent}% off!",
                 success=True,
-                sent_at=datetime.utcnow()
+                sent_at=now
             )
             db.session.add(offer_record)
-            db.session.commit()
-            
             self._log_automation('offer', listing.item_id, 'success',
                                f"Offer sent: {listing.title} - ${offer_price:.2f} ({discount_percent}% off)")
+            db.session.commit()
             
             return {
                 'success': True,
@@ -346,13 +452,158 @@ class AutomationEngine:
             
         except Exception as e:
             logger.error(f"Error sending offer for {item_id}: {e}")
-            self._log_automation('send_offer', item_id, 'failed', str(e))
+            self._log_failure('send_offer', item_id, str(e))
+            return {'success': False, 'error': str(e)}
+    
+    def relist_item(self, item_id: str, reason: str = 'manual') -> Dict:
+        """Relist a single item and record it in the relist history."""
+        try:
+            listing = Listing.get_by_item_id(item_id)
+            if not listing:
+                return {'success': False, 'error': 'Listing not found'}
+            
+            success = self.ebay.relist_item(item_id)
+            
+            if success:
+                relist_record = RelistHistory(
+                    listing_id=listing.id,
+                    item_id=item_id,
+                    reason=reason,
+                    success=True
+                )
+                db.session.add(relist_record)
+                db.session.commit()
+            
+            return {'success': success}
+            
+        except Exception as e:
+            logger.error(f"Error relisting {item_id}: {e}")
             return {'success': False, 'error': str(e)}
     
+    def refresh_images(self) -> Dict:
+        """Refresh gallery image URLs for all active listings."""
+        # Only the columns needed to compare images
+        listings = db.session.execute(
+            db.select(Listing.id, Listing.item_id, Listing.gallery_url).where(Listing.is_active.is_(True))
+        ).all()
+        
+        updates = []
+        failed_count = 0
+        now = datetime.utcnow()
+        
+        for listing, item_details in self._iter_item_details(listings):
+            if item_details and 'gallery_url' in item_details:
+                new_gallery_url = item_details['gallery_url']
+                
+                # Update the listing if we got a new image URL
+                if new_gallery_url and new_gallery_url != listing.gallery_url:
+                    updates.append({'id': listing.id, 'gallery_url': new_gallery_url, 'last_updated': now})
+                    logger.info(f"Updated image for {listing.item_id}: {new_gallery_url}")
+                else:
+                    logger.debug(f"No new image URL for {listing.item_id}")
+            else:
+                logger.warning(f"Could not get item details for {listing.item_id}")
+                failed_count += 1
+        
+        # Write all changes as one executemany UPDATE keyed on primary key
+        if updates:
+            db.session.execute(db.update(Listing), updates)
+        db.session.commit()
+        updated_count = len(updates)
+        
+        return {
+            'success': True,
+            'updated': updated_count,
+            'failed': failed_count,
+            'total_processed': len(listings),
+            'message': f'Refreshed images for {updated_count} listings'
+        }
+    
+    def _iter_item_details(self, listings):
+        """Yield (listing, item_details) pairs using as few eBay calls as possible.
+        
+        GetMyeBaySelling returns up to 200 active items per call, so most
+        listings are covered by a handful of paged requests. Only listings it
+        returns no image for fall back to GetItem, run concurrently.
+        """
+        batch_details = {d['item_id']: d for d in get_thread_api().get_active_listings()}
+        
+        missing = []
+        for listing in listings:
+            item_details = batch_details.get(listing.item_id)
+            if item_details and item_details.get('gallery_url'):
+                yield listing, item_details
+            else:
+                missing.append(listing)
+        
+        # Concurrency is bounded by EBAY_API_WORKERS; each worker thread uses
+        # its own eBayAPI and listings are only touched by the caller
+        with ThreadPoolExecutor(max_workers=Config.EBAY_API_WORKERS) as executor:
+            futures = {
+                executor.submit(self._fetch_item_details, listing.item_id): listing
+                for listing in missing
+            }
+            for future in as_completed(futures):
+                listing = futures[future]
+                try:
+                    yield listing, future.result()
+                except Exception as e:
+                    logger.error(f"Error refreshing image for {listing.item_id}: {e}")
+                    yield listing, None
+    
+    def _end_and_relist_all(self, listings):
+        """Yield (listing, result) for each end-and-relist, run concurrently.
+        
+        Concurrency is bounded by EBAY_API_WORKERS; each worker thread uses
+        its own eBayAPI and listings are only touched by the caller.
+        """
+        with ThreadPoolExecutor(max_workers=Config.EBAY_API_WORKERS) as executor:
+            futures = {
+                executor.submit(self._end_and_relist_item, listing.item_id): listing
+                for listing in listings
+            }
+            for future in as_completed(futures):
+                listing = futures[future]
+                try:
+                    yield listing, future.result()
+                except Exception as e:
+                    logger.error(f"Error ending and relisting {listing.item_id}: {e}")
+                    yield listing, {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    def _end_and_relist_item(item_id: str) -> Dict:
+        """End and relist an item on a worker thread using that thread's eBayAPI."""
+        return get_thread_api().end_and_relist_item(item_id)
+    
+    def _request_feedback_all(self, items):
+        """Yield (sold_item, success) for each feedback request, run concurrently like _end_and_relist_all."""
+        with ThreadPoolExecutor(max_workers=Config.EBAY_API_WORKERS) as executor:
+            futures = {
+                executor.submit(self._request_feedback, item.item_id, item.transaction_id, item.buyer_id): item
+                for item in items
+            }
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    yield item, future.result()
+                except Exception as e:
+                    logger.error(f"Error requesting feedback for {item.item_id}: {e}")
+                    yield item, False
+    
+    @staticmethod
+    def _request_feedback(item_id: str, transaction_id: str, buyer_id: str) -> bool:
+        """Send one feedback request on a worker thread using that thread's eBayAPI."""
+        return get_thread_api().request_feedback(item_id, transaction_id, buyer_id)
+    
+    @staticmethod
+    def _fetch_item_details(item_id: str):
+        """Fetch item details on a worker thread using that thread's eBayAPI."""
+        return get_thread_api().get_item_details(item_id)
+    
     def get_offer_eligibility(self, item_id: str) -> Dict:
         """Check if a listing is eligible for offers."""
         try:
-            listing = Listing.query.filter_by(item_id=item_id).first()
+            listing = Listing.get_by_item_id(item_id)
             if not listing:
                 return {'eligible': False, 'reason': 'Listing not found'}
             
@@ -368,12 +619,10 @@ class AutomationEngine:
                 }
             
             # Check recent offers
-            recent_offer = OfferSent.query.filter_by(
-                item_id=listing.item_id
-            ).order_by(OfferSent.sent_at.desc()).first()
+            last_offered_at = self._last_offer_at(listing.item_id)
             
-            if recent_offer:
-                days_since_offer = (datetime.utcnow() - recent_offer.sent_at).days
+            if last_offered_at:
+                days_since_offer = (datetime.utcnow() - last_offered_at).days
                 if days_since_offer < 14:
                     return {
                         'eligible': False,
@@ -398,58 +647,39 @@ class AutomationEngine:
             # Calculate offset
             offset = (page - 1) * per_page
             
-            # Build query based on status
-            query = Listing.query
+            # Select just the display columns; the rows are named tuples
+            stmt = db.select(
+                Listing.item_id,
+                Listing.title,
+                Listing.price,
+                Listing.quantity,
+                Listing.view_count,
+                Listing.watch_count,
+                Listing.days_listed.label('days_listed'),
+                Listing.gallery_url,
+                db.case((Listing.needs_attention, True), else_=False).label('is_stale'),
+                Listing.is_active
+            )
             
             if status == 'active':
-                query = query.filter_by(is_active=True)
+                stmt = stmt.where(Listing.is_active.is_(True))
             elif status == 'stale':
-                # Find stale listings using the same logic as check_stale_listings
-                stale_listings = []
-                all_listings = Listing.query.filter_by(is_active=True).all()
-                
-                for listing in all_listings:
-                    if listing.start_time:
-                        days_since_created = (datetime.utcnow() - listing.start_time).days
-                        
-                        is_old_low_traffic = (days_since_created >= 30 and listing.view_count < 10)
-                        is_very_old = (days_since_created >= 60)
-                        is_definitely_stale = (days_since_created >= 90)
-                        
-                        if is_old_low_traffic or is_very_old or is_definitely_stale:
-                            stale_listings.append(listing)
-                
-                # Convert to query result
-                listing_ids = [l.id for l in stale_listings]
-                query = query.filter(Listing.id.in_(listing_ids))
+                # Same rule as the listings page, evaluated in SQL
+                stmt = stmt.where(Listing.is_active.is_(True), Listing.needs_attention)
             elif status == 'inactive':
-                query = query.filter_by(is_active=False)
+                stmt = stmt.where(Listing.is_active.is_(False))
             
             # Get total count
-            total = query.count()
+            total = db.session.scalar(db.select(db.func.count()).select_from(stmt.subquery()))
             
-            # Get paginated results
-            listings = query.offset(offset).limit(per_page).all()
+            # Get paginated results; a stable order (same as the listings page,
+            # served by ix_listings_last_updated) keeps OFFSET pages from overlapping
+            rows = db.session.execute(stmt.order_by(
+                Listing.last_updated.desc(), Listing.id.desc()
+            ).offset(offset).limit(per_page)).all()
             
             # Convert to display format
-            items = []
-            for listing in listings:
-                days_listed = 0
-                if listing.start_time:
-                    days_listed = (datetime.utcnow() - listing.start_time).days
-                
-                items.append({
-                    'item_id': listing.item_id,
-                    'title': listing.title,
-                    'price': listing.price,
-                    'quantity': listing.quantity,
-                    'view_count': listing.view_count,
-                    'watch_count': listing.watch_count,
-                    'days_listed': days_listed,
-                    'gallery_url': listing.gallery_url,
-                    'is_stale': days_listed >= 30 and listing.view_count < 10 or days_listed >= 60,
-                    'is_active': listing.is_active
-                })
+            items = [row._asdict() for row in rows]
             
             total_pages = (total + per_page - 1) // per_page
             
@@ -477,55 +707,78 @@ class AutomationEngine:
         logger.info("Syncing sold items...")
         
         try:
-            sold_items = self.ebay.get_sold_items(days=30)
-            
             stats = {
-                'total': len(sold_items),
+                'total': 0,
                 'new': 0,
                 'updated': 0
             }
+            seen = set()
             
-            for item_data in sold_items:
-                # Check if sold item exists
-                sold_item = SoldItem.query.filter_by(
-                    transaction_id=item_data['transaction_id']
-                ).first()
-                
-                if sold_item:
-                    # Update existing record
-                    sold_item.feedback_received = item_data['feedback_received']
-                    stats['updated'] += 1
-                else:
-                    # Create new sold item record
-                    sold_item = SoldItem(
-                        item_id=item_data['item_id'],
-                        transaction_id=item_data['transaction_id'],
-                        title=item_data['title'],
-                        buyer_id=item_data['buyer_id'],
-                        buyer_email=item_data['buyer_email'],
-                        sale_price=item_data['sale_price'],
-                        quantity=item_data['quantity'],
-                        created_date=datetime.fromisoformat(item_data['created_date'].replace('Z', '+00:00')) if item_data['created_date'] else None,
-                        paid_time=datetime.fromisoformat(item_data['paid_time'].replace('Z', '+00:00')) if item_data['paid_time'] else None,
-                        shipped_time=datetime.fromisoformat(item_data['shipped_time'].replace('Z', '+00:00')) if item_data['shipped_time'] else None,
-                        feedback_received=item_data['feedback_received']
-                    )
-                    db.session.add(sold_item)
-                    stats['new'] += 1
+            # Upsert and commit each page as it arrives, like sync_listings
+            for page in self._prefetched(self.ebay.iter_sold_items(days=30)):
+                stats['total'] += len(page)
+                self._upsert_sold_item_page(page, seen, stats)
+                db.session.commit()
             
+            self._log_automation('sync_sold', None, 'success',
+                               f"Synced {stats['total']} sold items", orjson.dumps(stats).decode())
             db.session.commit()
             
             logger.info(f"Sold items sync complete: {stats}")
-            self._log_automation('sync_sold', None, 'success',
-                               f"Synced {stats['total']} sold items", json.dumps(stats))
             
             return stats
             
         except Exception as e:
             logger.error(f"Error syncing sold items: {e}")
-            self._log_automation('sync_sold', None, 'failed', str(e))
+            self._log_failure('sync_sold', None, str(e))
             return {'error': str(e)}
     
+    def _upsert_sold_item_page(self, page: List[Dict], seen: set, stats: Dict):
+        """Write one page of sold items: one lookup for the page's transactions, then bulk UPDATE/INSERT."""
+        page_items = {}
+        for item_data in page:
+            transaction_id = item_data['transaction_id']
+            if transaction_id not in seen:
+                seen.add(transaction_id)
+                page_items[transaction_id] = item_data
+        
+        existing = dict(db.session.execute(
+            db.select(SoldItem.transaction_id, SoldItem.id)
+            .where(SoldItem.transaction_id.in_(list(page_items)))
+        ).all()) if page_items else {}
+        
+        update_rows = []
+        insert_rows = []
+        for transaction_id, item_data in page_items.items():
+            sold_item_id = existing.get(transaction_id)
+            if sold_item_id:
+                # Update existing record
+                update_rows.append({
+                    'id': sold_item_id,
+                    'feedback_received': item_data['feedback_received']
+                })
+                stats['updated'] += 1
+            else:
+                # Create new sold item record
+                insert_rows.append({
+                    'item_id': item_data['item_id'],
+                    'transaction_id': transaction_id,
+                    'title': item_data['title'],
+                    'buyer_id': item_data['buyer_id'],
+                    'buyer_email': item_data['buyer_email'],
+                    'sale_price': item_data['sale_price'],
+                    'quantity': item_data['quantity'],
+                    'created_date': self._parse_ebay_datetime(item_data['created_date']),
+                    'paid_time': self._parse_ebay_datetime(item_data['paid_time']),
+                    'shipped_time': self._parse_ebay_datetime(item_data['shipped_time']),
+                    'feedback_received': item_data['feedback_received']
+                })
+                stats['new'] += 1
+        
+        if update_rows:
+            db.session.execute(db.update(SoldItem), update_rows)
+        self._bulk_insert(SoldItem, insert_rows)
+    
     def request_feedback_from_buyers(self) -> Dict:
         """Request feedback from buyers who haven't left it yet."""
         logger.info("Checking for feedback requests...")
@@ -534,35 +787,39 @@ class AutomationEngine:
             feedback_requests = 0
             failed_count = 0
             
-            # Find sold items ready for feedback request
-            sold_items = SoldItem.query.filter_by(
-                feedback_requested=False,
-                feedback_received=False
+            # Find sold items ready for feedback request (filtered in SQL)
+            ready_items = db.session.execute(
+                db.select(
+                    SoldItem.id, SoldItem.item_id, SoldItem.transaction_id,
+                    SoldItem.buyer_id, SoldItem.title
+                ).where(SoldItem.ready_for_feedback_request)
             ).all()
             
-            ready_items = [item for item in sold_items if item.ready_for_feedback_request]
-            
             logger.info(f"Found {len(ready_items)} items ready for feedback request")
             
-            for item in ready_items:
-                success = self.ebay.request_feedback(
-                    item.item_id,
-                    item.transaction_id,
-                    item.buyer_id
-                )
-                
+            requested_ids = []
+            log_rows = []
+            for item, success in self._request_feedback_all(ready_items):
                 if success:
-                    item.feedback_requested = True
-                    item.feedback_requested_at = datetime.utcnow()
+                    requested_ids.append(item.id)
                     feedback_requests += 1
                     
-                    self._log_automation('feedback', item.item_id, 'success',
-                                       f"Requested feedback for: {item.title}")
+                    log_rows.append(self._log_row('feedback', item.item_id, 'success',
+                                                  f"Requested feedback for: {item.title}"))
                 else:
                     failed_count += 1
-                    self._log_automation('feedback', item.item_id, 'failed',
-                                       f"Failed to request feedback: {item.title}")
-            
+                    log_rows.append(self._log_row('feedback', item.item_id, 'failed',
+                                                  f"Failed to request feedback: {item.title}"))
+            
+            # Flag every successful request with one UPDATE per chunk of ids
+            requested_at = datetime.utcnow()
+            for start in range(0, len(requested_ids), SQL_IN_CHUNK_SIZE):
+                db.session.execute(
+                    db.update(SoldItem)
+                    .where(SoldItem.id.in_(requested_ids[start:start + SQL_IN_CHUNK_SIZE]))
+                    .values(feedback_requested=True, feedback_requested_at=requested_at)
+                )
+            self._bulk_insert(AutomationLog, log_rows)
             db.session.commit()
             
             result = {
@@ -576,12 +833,72 @@ class AutomationEngine:
             
         except Exception as e:
             logger.error(f"Error requesting feedback: {e}")
-            self._log_automation('request_feedback', None, 'failed', str(e))
+            self._log_failure('request_feedback', None, str(e))
             return {'error': str(e)}
     
+    def refresh_dashboard_stats(self) -> DashboardStats:
+        """Recompute the dashboard counters and store them in the single stats row."""
+        # Midnight UTC computed by SQLite, so the date cutoff never leaves the database
+        today_start = db.func.datetime('now', 'start of day')
+        is_active = Listing.is_active.is_(True)
+        
+        # One round trip: conditional aggregates over listings plus the
+        # remaining counters as scalar subqueries
+        (active_listings, stale_listings, total_views, total_watchers,
+         sold_items, pending_feedback, relists_today, offers_today) = db.session.query(
+            db.func.count(db.case((is_active, 1))),
+            db.func.count(db.case((db.and_(is_active, Listing.is_stale), 1))),
+            db.func.coalesce(db.func.sum(db.case((is_active, Listing.view_count), else_=0)), 0),
+            db.func.coalesce(db.func.sum(db.case((is_active, Listing.watch_count), else_=0)), 0),
+            db.select(db.func.count(SoldItem.id)).scalar_subquery(),
+            db.select(db.func.count(SoldItem.id)).where(
+                SoldItem.feedback_requested.is_(False),
+                SoldItem.feedback_received.is_(False)
+            ).scalar_subquery(),
+            db.select(db.func.count(RelistHistory.id)).where(
+                RelistHistory.relisted_at >= today_start
+            ).scalar_subquery(),
+            db.select(db.func.count(OfferSent.id)).where(
+                OfferSent.sent_at >= today_start
+            ).scalar_subquery()
+        ).select_from(Listing).one()
+        
+        stats = db.session.merge(DashboardStats(
+            id=1,
+            active_listings=active_listings,
+            stale_listings=stale_listings,
+            total_views=int(total_views),
+            total_watchers=int(total_watchers),
+            sold_items=sold_items,
+            pending_feedback=pending_feedback,
+            relists_today=relists_today,
+            offers_today=offers_today,
+            updated_at=datetime.utcnow()
+        ))
+        db.session.commit()
+        return stats
+    
+    @staticmethod
+    def _log_row(action_type: str, item_id: str, status: str,
+                 message: str, details: str = None) -> Dict:
+        """Build an AutomationLog row for _bulk_insert."""
+        return {
+            'action_type': action_type,
+            'item_id': item_id,
+            'status': status,
+            'message': message,
+            'details': details
+        }
+    
+    @staticmethod
+    def _bulk_insert(model, rows: List[Dict]):
+        """Insert rows for model in one executemany INSERT (no-op when empty)."""
+        if rows:
+            db.session.execute(db.insert(model), rows)
+    
     def _log_automation(self, action_type: str, item_id: str, status: str, 
                        message: str, details: str = None):
-        """Log automation activity to database."""
+        """Add an automation log entry to the session; the calling method commits."""
         try:
             log = AutomationLog(
                 action_type=action_type,
@@ -591,8 +908,16 @@ class AutomationEngine:
                 details=details
             )
             db.session.add(log)
-            db.session.commit()
         except Exception as e:
             logger.error(f"Failed to log automation activity: {e}")
+    
+    def _log_failure(self, action_type: str, item_id: str, message: str):
+        """Roll back the failed work and commit just a 'failed' log entry."""
+        try:
+            db.session.rollback()
+            self._log_automation(action_type, item_id, 'failed', message)
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Failed to log automation failure: {e}")
 
 
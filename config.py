@@ -1,6 +1,8 @@
 """Configuration management for eBay automation tool."""
 import os
 from dotenv import load_dotenv
+import orjson
+from sqlalchemy.pool import NullPool
 
 # Load environment variables
 load_dotenv()
@@ -19,20 +21,66 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE_PATH}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # JSON columns (images, tags) are encoded/decoded by orjson inside SQLAlchemy
+    _JSON_CODEC = {
+        'json_serializer': lambda obj: orjson.dumps(obj).decode(),
+        'json_deserializer': orjson.loads
+    }
+    
+    # Connection pool (DB_POOL_CLASS=null opens a fresh connection per checkout,
+    # useful for gunicorn --preload or serverless deployments)
+    DB_POOL_CLASS = os.getenv('DB_POOL_CLASS', 'queue').lower()
+    if DB_POOL_CLASS == 'null':
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'poolclass': NullPool,
+            'pool_pre_ping': True,
+            **_JSON_CODEC
+        }
+    else:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': True,
+            # Reuse the most recently returned connection so idle extras can time out
+            'pool_use_lifo': True,
+            **_JSON_CODEC
+        }
+    
+    # Response caching. SimpleCache is per-process and only fits a single
+    # `python app.py`; gunicorn refuses to start with it (see gunicorn_conf.py)
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'SimpleCache')
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 60))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+    
+    # Rate limiting (use a redis:// URI to share limits across workers)
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
+    WEBHOOK_RATE_LIMIT = os.getenv('WEBHOOK_RATE_LIMIT', '60/minute')
+    
     # eBay API credentials
     EBAY_APP_ID = os.getenv('EBAY_APP_ID')
     EBAY_CERT_ID = os.getenv('EBAY_CERT_ID')
     EBAY_DEV_ID = os.getenv('EBAY_DEV_ID')
     EBAY_TOKEN = os.getenv('EBAY_TOKEN')
     EBAY_ENV = os.getenv('EBAY_ENV', 'production')
+    # Max concurrent eBay calls for bulk refreshes (keep under eBay's rate limits)
+    EBAY_API_WORKERS = int(os.getenv('EBAY_API_WORKERS', 8))
     
     # Automation settings
     STALE_LISTING_DAYS = int(os.getenv('STALE_LISTING_DAYS', 30))
     MIN_VIEWS_FOR_OFFER = int(os.getenv('MIN_VIEWS_FOR_OFFER', 5))
     OFFER_DISCOUNT_PERCENT = float(os.getenv('OFFER_DISCOUNT_PERCENT', 10))
     FEEDBACK_REQUEST_DAYS = int(os.getenv('FEEDBACK_REQUEST_DAYS', 7))
+    # A draft stuck in 'publishing' this long (worker killed mid-publish) can be published again
+    PUBLISH_CLAIM_TIMEOUT_MINUTES = int(os.getenv('PUBLISH_CLAIM_TIMEOUT_MINUTES', 10))
     
     # Scheduler settings
+    # Off by default: exactly one process (`flask --app app run-scheduler`, or a
+    # single dev server with EBAY_RUN_SCHEDULER=1) should run scheduled jobs
+    RUN_SCHEDULER = os.getenv('EBAY_RUN_SCHEDULER', '0').lower() in ('1', 'true', 'yes')
+    # How often the scheduler process picks up jobs queued from the dashboard
+    JOB_POLL_SECONDS = int(os.getenv('JOB_POLL_SECONDS', 2))
     STALE_CHECK_SCHEDULE = os.getenv('STALE_CHECK_SCHEDULE', '0 2 * * *')
     OFFER_CHECK_SCHEDULE = os.getenv('OFFER_CHECK_SCHEDULE', '0 10 * * *')
     FEEDBACK_CHECK_SCHEDULE = os.getenv('FEEDBACK_CHECK_SCHEDULE', '0 15 * * *')
@@ -40,6 +88,10 @@ class Config:
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     
+    # Debug/staging: count SQL queries per request (X-Query-Count header)
+    SQL_QUERY_COUNT = os.getenv('SQL_QUERY_COUNT', '0').lower() in ('1', 'true', 'yes')
+    SQL_QUERY_WARN_THRESHOLD = int(os.getenv('SQL_QUERY_WARN_THRESHOLD', 10))
+    
     @staticmethod
     def validate():
         """Validate required configuration."""
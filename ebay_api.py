@@ -1,7 +1,8 @@
 """eBay API integration module."""
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import threading
+from datetime import datetime
+from typing import Iterator, List, Dict, Optional
 
 from ebaysdk.trading import Connection as Trading
 from ebaysdk.exception import ConnectionError
@@ -33,51 +34,7 @@ class eBayAPI:
     def get_active_listings(self) -> List[Dict]:
         """Get all active listings from the seller's account with pagination."""
         try:
-            all_listings = []
-            page_number = 1
-            entries_per_page = 200
-            
-            while True:
-                logger.info(f"Fetching page {page_number} of listings...")
-                
-                response = self.api.execute('GetMyeBaySelling', {
-                    'ActiveList': {
-                        'Include': True,
-                        'Pagination': {
-                            'EntriesPerPage': entries_per_page,
-                            'PageNumber': page_number
-                        }
-                    },
-                    'DetailLevel': 'ReturnAll'
-                })
-                
-                if not response.reply.ActiveList or not hasattr(response.reply.ActiveList, 'ItemArray'):
-                    break
-                    
-                items = response.reply.ActiveList.ItemArray.Item
-                if not items:
-                    break
-                
-                # Handle single item case (eBay returns single item as object, not array)
-                if not isinstance(items, list):
-                    items = [items]
-                
-                page_listings = []
-                for item in items:
-                    page_listings.append(self._parse_listing(item))
-                
-                all_listings.extend(page_listings)
-                logger.info(f"Retrieved {len(page_listings)} listings from page {page_number}")
-                
-                # Check if we got fewer items than requested (last page)
-                if len(page_listings) < entries_per_page:
-                    break
-                    
-                page_number += 1
-            
-            logger.info(f"Retrieved {len(all_listings)} total active listings across {page_number} pages")
-            return all_listings
-            
+            return [listing for page in self.iter_active_listings() for listing in page]
         except ConnectionError as e:
             logger.error(f"eBay API error getting active listings: {e}")
             return []
@@ -85,34 +42,57 @@ class eBayAPI:
             logger.error(f"Unexpected error getting active listings: {e}")
             return []
     
-    def get_sold_items(self, days: int = 30) -> List[Dict]:
-        """Get sold items from the last N days."""
-        try:
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(days=days)
+    def iter_active_listings(self, page_size: int = 200) -> Iterator[List[Dict]]:
+        """Yield the seller's active listings one API page at a time.
+        
+        Unlike get_active_listings, errors propagate so callers can tell a
+        failed fetch from an empty store.
+        """
+        page_number = 1
+        total = 0
+        
+        while True:
+            logger.info(f"Fetching page {page_number} of listings...")
             
             response = self.api.execute('GetMyeBaySelling', {
-                'SoldList': {
+                'ActiveList': {
                     'Include': True,
                     'Pagination': {
-                        'EntriesPerPage': 200
+                        'EntriesPerPage': page_size,
+                        'PageNumber': page_number
                     }
                 },
                 'DetailLevel': 'ReturnAll'
             })
             
-            sold_items = []
-            if response.reply.SoldList:
-                items = response.reply.SoldList.OrderTransactionArray.OrderTransaction if hasattr(
-                    response.reply.SoldList, 'OrderTransactionArray'
-                ) else []
+            if not response.reply.ActiveList or not hasattr(response.reply.ActiveList, 'ItemArray'):
+                break
                 
-                for item in items:
-                    sold_items.append(self._parse_sold_item(item))
+            items = response.reply.ActiveList.ItemArray.Item
+            if not items:
+                break
+            
+            # Handle single item case (eBay returns single item as object, not array)
+            if not isinstance(items, list):
+                items = [items]
             
-            logger.info(f"Retrieved {len(sold_items)} sold items")
-            return sold_items
+            page_listings = [self._parse_listing(item) for item in items]
+            total += len(page_listings)
+            logger.info(f"Retrieved {len(page_listings)} listings from page {page_number}")
+            yield page_listings
             
+            # Check if we got fewer items than requested (last page)
+            if len(page_listings) < page_size:
+                break
+                
+            page_number += 1
+        
+        logger.info(f"Retrieved {total} total active listings across {page_number} pages")
+    
+    def get_sold_items(self, days: int = 30) -> List[Dict]:
+        """Get sold items from the last N days."""
+        try:
+            return [item for page in self.iter_sold_items(days) for item in page]
         except ConnectionError as e:
             logger.error(f"eBay API error getting sold items: {e}")
             return []
@@ -120,6 +100,50 @@ class eBayAPI:
             logger.error(f"Unexpected error getting sold items: {e}")
             return []
     
+    def iter_sold_items(self, days: int = 30, page_size: int = 200) -> Iterator[List[Dict]]:
+        """Yield sold items from the last N days one API page at a time.
+        
+        Like iter_active_listings, errors propagate to the caller.
+        """
+        page_number = 1
+        total = 0
+        
+        while True:
+            response = self.api.execute('GetMyeBaySelling', {
+                'SoldList': {
+                    'Include': True,
+                    'DurationInDays': days,
+                    'Pagination': {
+                        'EntriesPerPage': page_size,
+                        'PageNumber': page_number
+                    }
+                },
+                'DetailLevel': 'ReturnAll'
+            })
+            
+            if not response.reply.SoldList or not hasattr(response.reply.SoldList, 'OrderTransactionArray'):
+                break
+            
+            items = response.reply.SoldList.OrderTransactionArray.OrderTransaction
+            if not items:
+                break
+            
+            # Handle single item case (eBay returns single item as object, not array)
+            if not isinstance(items, list):
+                items = [items]
+            
+            page_items = [self._parse_sold_item(item) for item in items]
+            total += len(page_items)
+            yield page_items
+            
+            # Check if we got fewer items than requested (last page)
+            if len(page_items) < page_size:
+                break
+            
+            page_number += 1
+        
+        logger.info(f"Retrieved {total} sold items across {page_number} pages")
+    
     def end_listing(self, item_id: str, reason: str = "NotAvailable") -> bool:
         """End a listing."""
         try:
@@ -426,14 +450,8 @@ class eBayAPI:
                         logger.debug(f"Using PictureDetails.PictureURL: {picture_urls}")
                         return picture_urls
         
-        # Try to construct eBay image URL from item ID as fallback
-        item_id = getattr(item, 'ItemID', '')
-        if item_id:
-            # eBay's standard image URL format
-            fallback_url = f"https://i.ebayimg.com/images/g/{item_id}/s-l500.jpg"
-            logger.debug(f"Using fallback eBay image URL: {fallback_url}")
-            return fallback_url
-        
+        # No real picture: return empty so callers can fall back to GetItem,
+        # and the dashboard to eBay's guessed URL, instead of storing a guess
         logger.debug("No image URL found, returning empty string")
         return ''
     
@@ -518,3 +536,16 @@ class eBayAPI:
             return False
 
 
+_thread_state = threading.local()
+
+
+def get_thread_api() -> eBayAPI:
+    """Return an eBayAPI owned by the calling thread (ebaysdk connections aren't thread-safe).
+    
+    Each client is built once per thread and keeps its requests session, so
+    calls reuse warm HTTPS connections. EBAY_TOKEN is a long-lived user token
+    read once from config; there is no per-call token refresh to cache.
+    """
+    if not hasattr(_thread_state, 'ebay'):
+        _thread_state.ebay = eBayAPI()
+    return _thread_state.ebay
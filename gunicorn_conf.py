@@ -0,0 +1,47 @@
+"""Gunicorn configuration for serving the dashboard in production.
+
+Usage: gunicorn -c gunicorn_conf.py app:app
+"""
+import multiprocessing
+import os
+import sys
+
+# Web workers never run the scheduler; start it separately with
+# `flask --app app run-scheduler` so jobs fire exactly once. Slow dashboard
+# actions are queued in the jobs table and run by that process.
+os.environ['EBAY_RUN_SCHEDULER'] = '0'
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5001')}"
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+keepalive = 5
+preload_app = True
+
+# Cache backends that live inside one process. Cached stats and pages are
+# invalidated by whichever worker (or the scheduler process) changed the data,
+# so every process must share one backend.
+PER_PROCESS_CACHE_TYPES = {'SimpleCache', 'simple'}
+
+
+def on_starting(server):
+    """Refuse to start with a per-process response cache."""
+    from config import Config
+    
+    if Config.CACHE_TYPE in PER_PROCESS_CACHE_TYPES:
+        server.log.error(
+            f"CACHE_TYPE={Config.CACHE_TYPE} is per-process, so workers would serve stale "
+            "responses after another process changes data. Set CACHE_TYPE=RedisCache and "
+            "CACHE_REDIS_URL, or CACHE_TYPE=NullCache to disable caching."
+        )
+        sys.exit(1)
+
+
+def post_fork(server, worker):
+    """Drop DB connections inherited from the preloaded master process."""
+    from app import app
+    from models import db
+    
+    with app.app_context():
+        db.engine.dispose(close=False)
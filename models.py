@@ -1,14 +1,31 @@
 """Database models for eBay automation."""
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.ext.hybrid import hybrid_property
 
 db = SQLAlchemy()
 
 
+def create_missing_indexes():
+    """Create indexes added to models after their tables already existed.
+    
+    db.create_all() skips existing tables entirely, so new indexes would
+    otherwise never reach an existing database.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
 class Listing(db.Model):
     """Track eBay listings and their metrics."""
     
     __tablename__ = 'listings'
+    __table_args__ = (
+        db.Index('ix_listings_stale_scan', 'is_active', 'start_time', 'view_count', 'quantity_sold'),
+        db.Index('ix_listings_active_last_updated', 'is_active', 'last_updated'),
+        db.Index('ix_listings_last_updated', 'last_updated', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -34,30 +51,70 @@ class Listing(db.Model):
     def __repr__(self):
         return f'<Listing {self.item_id}: {self.title}>'
     
-    @property
+    @classmethod
+    def get_by_item_id(cls, item_id):
+        """Look up a listing by eBay item ID via its unique index."""
+        return db.session.execute(
+            db.select(cls).where(cls.item_id == item_id)
+        ).scalar_one_or_none()
+    
+    @hybrid_property
     def days_listed(self):
         """Calculate how many days the listing has been active."""
         if self.start_time:
             return (datetime.utcnow() - self.start_time).days
         return 0
     
-    @property
+    @days_listed.expression
+    def days_listed(cls):
+        """SQL equivalent of days_listed (SQLite julianday arithmetic)."""
+        elapsed = db.func.julianday('now') - db.func.julianday(cls.start_time)
+        return db.func.coalesce(db.cast(elapsed, db.Integer), 0)
+    
+    @hybrid_property
     def is_stale(self):
         """Check if listing is considered stale based on configuration."""
         from config import Config
         return self.days_listed >= Config.STALE_LISTING_DAYS
+    
+    @is_stale.expression
+    def is_stale(cls):
+        """SQL equivalent of is_stale, usable in query filters."""
+        from config import Config
+        cutoff = datetime.utcnow() - timedelta(days=Config.STALE_LISTING_DAYS)
+        return cls.start_time <= cutoff
+    
+    @hybrid_property
+    def needs_attention(self):
+        """Old with low traffic (30+ days, under 10 views) or very old (60+ days)."""
+        if not self.start_time:
+            return False
+        days = self.days_listed
+        return (days >= 30 and self.view_count < 10) or days >= 60
+    
+    @needs_attention.expression
+    def needs_attention(cls):
+        """SQL equivalent of needs_attention, usable in query filters."""
+        now = datetime.utcnow()
+        return db.or_(
+            cls.start_time <= now - timedelta(days=60),
+            db.and_(cls.start_time <= now - timedelta(days=30), cls.view_count < 10)
+        )
 
 
 class RelistHistory(db.Model):
     """Track when items are relisted."""
     
     __tablename__ = 'relist_history'
+    __table_args__ = (
+        db.Index('ix_relist_history_item_relisted', 'item_id', 'relisted_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     listing_id = db.Column(db.Integer, db.ForeignKey('listings.id'), nullable=False)
-    item_id = db.Column(db.String(50), nullable=False, index=True)
+    item_id = db.Column(db.String(50), nullable=False)
     new_item_id = db.Column(db.String(50), nullable=True, index=True)  # For end and relist operations
-    relisted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    relisted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     reason = db.Column(db.String(100))
     success = db.Column(db.Boolean, default=True)
     error_message = db.Column(db.Text)
@@ -70,16 +127,19 @@ class OfferSent(db.Model):
     """Track offers sent to buyers."""
     
     __tablename__ = 'offers_sent'
+    __table_args__ = (
+        db.Index('ix_offers_sent_item_sent', 'item_id', 'sent_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     listing_id = db.Column(db.Integer, db.ForeignKey('listings.id'), nullable=False)
-    item_id = db.Column(db.String(50), nullable=False, index=True)
-    buyer_id = db.Column(db.String(100))
+    item_id = db.Column(db.String(50), nullable=False)
+    buyer_id = db.Column(db.String(100), index=True)
     offer_price = db.Column(db.Float, nullable=False)
     original_price = db.Column(db.Float)
     discount_percent = db.Column(db.Float)
     message = db.Column(db.Text)
-    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     success = db.Column(db.Boolean, default=True)
     error_message = db.Column(db.Text)
     
@@ -91,12 +151,15 @@ class SoldItem(db.Model):
     """Track sold items for feedback management."""
     
     __tablename__ = 'sold_items'
+    __table_args__ = (
+        db.Index('ix_sold_items_feedback_ready', 'feedback_requested', 'feedback_received', 'created_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.String(50), nullable=False, index=True)
     transaction_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
     title = db.Column(db.String(200))
-    buyer_id = db.Column(db.String(100), nullable=False)
+    buyer_id = db.Column(db.String(100), nullable=False, index=True)
     buyer_email = db.Column(db.String(200))
     sale_price = db.Column(db.Float)
     quantity = db.Column(db.Integer)
@@ -118,7 +181,7 @@ class SoldItem(db.Model):
             return (datetime.utcnow() - self.created_date).days
         return 0
     
-    @property
+    @hybrid_property
     def ready_for_feedback_request(self):
         """Check if it's time to request feedback."""
         from config import Config
@@ -128,12 +191,28 @@ class SoldItem(db.Model):
             self.shipped_time and
             self.days_since_sale >= Config.FEEDBACK_REQUEST_DAYS
         )
+    
+    @ready_for_feedback_request.expression
+    def ready_for_feedback_request(cls):
+        """SQL equivalent of ready_for_feedback_request, usable in query filters."""
+        from config import Config
+        cutoff = datetime.utcnow() - timedelta(days=Config.FEEDBACK_REQUEST_DAYS)
+        return db.and_(
+            cls.feedback_requested.is_(False),
+            cls.feedback_received.is_(False),
+            cls.shipped_time.isnot(None),
+            cls.created_date <= cutoff
+        )
 
 
 class AutomationLog(db.Model):
     """Log all automation activities."""
     
     __tablename__ = 'automation_logs'
+    __table_args__ = (
+        db.Index('ix_automation_logs_created_at_id', 'created_at', 'id'),
+        db.Index('ix_automation_logs_type_created_at', 'action_type', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     action_type = db.Column(db.String(50), nullable=False, index=True)  # 'relist', 'offer', 'feedback'
@@ -147,6 +226,103 @@ class AutomationLog(db.Model):
         return f'<AutomationLog {self.action_type} - {self.status}>'
 
 
+class DashboardStats(db.Model):
+    """Precomputed dashboard counters, refreshed periodically by the scheduler."""
+    
+    __tablename__ = 'dashboard_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    active_listings = db.Column(db.Integer, default=0)
+    stale_listings = db.Column(db.Integer, default=0)
+    total_views = db.Column(db.Integer, default=0)
+    total_watchers = db.Column(db.Integer, default=0)
+    sold_items = db.Column(db.Integer, default=0)
+    pending_feedback = db.Column(db.Integer, default=0)
+    relists_today = db.Column(db.Integer, default=0)
+    offers_today = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DashboardStats updated {self.updated_at}>'
+    
+    def to_dict(self):
+        """Shape the counters the way /api/stats returns them."""
+        return {
+            'listings': {
+                'active': self.active_listings,
+                'stale': self.stale_listings,
+                'total_views': self.total_views,
+                'total_watchers': self.total_watchers
+            },
+            'sales': {
+                'total_sold': self.sold_items,
+                'pending_feedback': self.pending_feedback
+            },
+            'automation': {
+                'relists_today': self.relists_today,
+                'offers_today': self.offers_today
+            }
+        }
+
+
+class Job(db.Model):
+    """On-demand background job, queued by web workers and run by the scheduler process."""
+    
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_created_at', 'status', 'created_at'),
+    )
+    
+    id = db.Column(db.String(64), primary_key=True)  # e.g. 'relist_1a2b3c4d'
+    job_type = db.Column(db.String(50), nullable=False)  # 'relist', 'refresh_images', 'poshmark_scrape'
+    payload = db.Column(db.JSON)  # Keyword arguments for the job
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, success, failed
+    result = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<Job {self.id}: {self.status}>'
+    
+    def to_dict(self):
+        """Shape the job the way /api/jobs/<job_id> returns it."""
+        return {
+            **(self.result or {}),
+            **(self.payload or {}),
+            'job_id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class ScheduledJob(db.Model):
+    """Recurring scheduler job and its next run, published by the scheduler process for /api/jobs."""
+    
+    __tablename__ = 'scheduled_jobs'
+    
+    id = db.Column(db.String(64), primary_key=True)  # APScheduler job id
+    name = db.Column(db.String(100))
+    trigger = db.Column(db.String(200))
+    next_run = db.Column(db.DateTime)  # UTC
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ScheduledJob {self.id}: {self.next_run}>'
+    
+    def to_dict(self):
+        """Shape the job the way /api/jobs returns it."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'next_run': self.next_run,
+            'trigger': self.trigger
+        }
+
+
 class Settings(db.Model):
     """Store application settings and preferences."""
     
@@ -166,6 +342,9 @@ class PoshmarkListing(db.Model):
     """Track Poshmark listings scraped from users."""
     
     __tablename__ = 'poshmark_listings'
+    __table_args__ = (
+        db.Index('ix_poshmark_listings_scraped_at_id', 'scraped_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     poshmark_id = db.Column(db.String(100), unique=True, nullable=False, index=True)
@@ -179,8 +358,8 @@ class PoshmarkListing(db.Model):
     category = db.Column(db.String(100))
     condition = db.Column(db.String(50))
     seller_username = db.Column(db.String(100))
-    images = db.Column(db.Text)  # JSON string of image URLs
-    tags = db.Column(db.Text)    # JSON string of tags
+    images = db.Column(db.JSON)  # List of image URLs
+    tags = db.Column(db.JSON)    # List of tags
     scraped_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -195,9 +374,12 @@ class EbayDraft(db.Model):
     """Track eBay draft listings created from Poshmark listings."""
     
     __tablename__ = 'ebay_drafts'
+    __table_args__ = (
+        db.Index('ix_ebay_drafts_status_created_at_id', 'status', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    poshmark_listing_id = db.Column(db.Integer, db.ForeignKey('poshmark_listings.id'), nullable=False)
+    poshmark_listing_id = db.Column(db.Integer, db.ForeignKey('poshmark_listings.id'), nullable=False, index=True)
     ebay_item_id = db.Column(db.String(50), unique=True, index=True)  # Set when published
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -206,11 +388,11 @@ class EbayDraft(db.Model):
     category_id = db.Column(db.String(50))
     condition_id = db.Column(db.String(50))
     condition_description = db.Column(db.String(200))
-    images = db.Column(db.Text)  # JSON string of image URLs
+    images = db.Column(db.JSON)  # List of image URLs
     location = db.Column(db.String(100), default='United States')
     listing_duration = db.Column(db.String(20), default='GTC')  # Good 'Til Cancelled
     listing_type = db.Column(db.String(20), default='FixedPriceItem')
-    status = db.Column(db.String(20), default='draft')  # draft, published, failed
+    status = db.Column(db.String(20), default='draft')  # draft, publishing, published, failed
     error_message = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
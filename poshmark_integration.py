@@ -1,5 +1,4 @@
 """Poshmark scraper integration for eBay tools."""
-import json
 import logging
 import time
 from datetime import datetime
@@ -12,6 +11,7 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
+from sqlalchemy.orm import raiseload
 import re
 
 from models import db, PoshmarkListing, EbayDraft
@@ -308,8 +308,8 @@ class PoshmarkScraperIntegration:
                     existing.size = listing_data['size']
                     existing.category = listing_data['category']
                     existing.condition = listing_data['condition']
-                    existing.images = json.dumps(listing_data['images'])
-                    existing.tags = json.dumps(listing_data['tags'])
+                    existing.images = listing_data['images']
+                    existing.tags = listing_data['tags']
                     existing.last_updated = datetime.utcnow()
                 else:
                     # Create new listing
@@ -325,8 +325,8 @@ class PoshmarkScraperIntegration:
                         category=listing_data['category'],
                         condition=listing_data['condition'],
                         seller_username=listing_data['seller_username'],
-                        images=json.dumps(listing_data['images']),
-                        tags=json.dumps(listing_data['tags'])
+                        images=listing_data['images'],
+                        tags=listing_data['tags']
                     )
                     db.session.add(new_listing)
                 
@@ -351,30 +351,41 @@ class PoshmarkScraperIntegration:
         logger.info(f"Creating eBay drafts from {len(poshmark_listing_ids)} Poshmark listings")
         
         try:
-            created_count = 0
             failed_count = 0
+            listing_ids = [int(listing_id) for listing_id in poshmark_listing_ids]
+            draft_rows = []
             
-            for listing_id in poshmark_listing_ids:
+            # Load the listings and which of them already have drafts in two
+            # queries up front rather than two per listing; raiseload turns an
+            # accidental per-listing relationship load into an error
+            listings_by_id = {
+                listing.id: listing
+                for listing in PoshmarkListing.query.options(raiseload('*')).filter(
+                    PoshmarkListing.id.in_(listing_ids)
+                )
+            }
+            drafted_ids = set(db.session.execute(
+                db.select(EbayDraft.poshmark_listing_id).where(EbayDraft.poshmark_listing_id.in_(listing_ids))
+            ).scalars())
+            
+            for listing_id in listing_ids:
                 try:
-                    poshmark_listing = PoshmarkListing.query.get(listing_id)
+                    poshmark_listing = listings_by_id.get(listing_id)
                     if not poshmark_listing:
                         logger.warning(f"Poshmark listing {listing_id} not found")
                         failed_count += 1
                         continue
                     
                     # Check if draft already exists
-                    existing_draft = EbayDraft.query.filter_by(
-                        poshmark_listing_id=listing_id
-                    ).first()
-                    
-                    if existing_draft:
+                    if listing_id in drafted_ids:
                         logger.info(f"Draft already exists for Poshmark listing {listing_id}")
                         continue
                     
-                    # Create eBay draft
-                    draft = self._create_draft_from_poshmark(poshmark_listing)
-                    if draft:
-                        created_count += 1
+                    # Build the eBay draft row
+                    draft_row = self._create_draft_from_poshmark(poshmark_listing)
+                    if draft_row:
+                        draft_rows.append(draft_row)
+                        drafted_ids.add(listing_id)
                     else:
                         failed_count += 1
                         
@@ -382,7 +393,11 @@ class PoshmarkScraperIntegration:
                     logger.error(f"Error creating draft for listing {listing_id}: {str(e)}")
                     failed_count += 1
             
-            db.session.commit()
+            # One multi-row INSERT and one commit for the whole batch
+            if draft_rows:
+                db.session.execute(db.insert(EbayDraft), draft_rows)
+                db.session.commit()
+            created_count = len(draft_rows)
             
             return {
                 'success': True,
@@ -402,12 +417,12 @@ class PoshmarkScraperIntegration:
                 'total_processed': len(poshmark_listing_ids)
             }
     
-    def _create_draft_from_poshmark(self, poshmark_listing: PoshmarkListing) -> Optional[EbayDraft]:
-        """Create an eBay draft from a Poshmark listing."""
+    def _create_draft_from_poshmark(self, poshmark_listing: PoshmarkListing) -> Optional[Dict]:
+        """Build the eBay draft row for a Poshmark listing (inserted by the caller)."""
         try:
             # Parse images and tags from JSON
-            images = json.loads(poshmark_listing.images) if poshmark_listing.images else []
-            tags = json.loads(poshmark_listing.tags) if poshmark_listing.tags else []
+            images = poshmark_listing.images or []
+            tags = poshmark_listing.tags or []
             
             # Map Poshmark condition to eBay condition
             condition_mapping = {
@@ -422,24 +437,23 @@ class PoshmarkScraperIntegration:
             condition_id = condition_mapping.get(poshmark_listing.condition, '3000')
             
             # Create draft
-            draft = EbayDraft(
-                poshmark_listing_id=poshmark_listing.id,
-                title=poshmark_listing.title,
-                description=self._create_ebay_description(poshmark_listing),
-                price=poshmark_listing.price,
-                quantity=1,
-                category_id=self._map_category_to_ebay(poshmark_listing.category),
-                condition_id=condition_id,
-                condition_description=poshmark_listing.condition,
-                images=json.dumps(images),
-                location='United States',
-                listing_duration='GTC',
-                listing_type='FixedPriceItem',
-                status='draft'
-            )
+            draft = {
+                'poshmark_listing_id': poshmark_listing.id,
+                'title': poshmark_listing.title,
+                'description': self._create_ebay_description(poshmark_listing),
+                'price': poshmark_listing.price,
+                'quantity': 1,
+                'category_id': self._map_category_to_ebay(poshmark_listing.category),
+                'condition_id': condition_id,
+                'condition_description': poshmark_listing.condition,
+                'images': images,
+                'location': 'United States',
+                'listing_duration': 'GTC',
+                'listing_type': 'FixedPriceItem',
+                'status': 'draft'
+            }
             
-            db.session.add(draft)
-            logger.info(f"Created draft for Poshmark listing: {poshmark_listing.title}")
+            logger.info(f"Prepared draft for Poshmark listing: {poshmark_listing.title}")
             
             return draft
             
@@ -1,23 +1,68 @@
 """Scheduler for automated tasks."""
 import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from flask import Flask
 
 from automation import AutomationEngine
 from config import Config
+from models import db, Job, ScheduledJob
+from poshmark_integration import PoshmarkScraperIntegration
 
 logger = logging.getLogger(__name__)
 
+# Finished on-demand jobs are kept this long for status polling
+JOB_RETENTION_DAYS = 7
+
+# Recurring jobs left out of the published schedule (runs every few seconds)
+UNPUBLISHED_JOBS = {'poll_jobs'}
+
+
+def enqueue_job(job_type: str, payload: dict = None) -> str:
+    """Queue an on-demand job for the scheduler process; returns its job id.
+    
+    Works from any process: the job is a row in the jobs table, which the
+    scheduler process polls, so web workers don't need a scheduler of their own.
+    """
+    job_id = f"{job_type}_{uuid.uuid4().hex[:8]}"
+    db.session.add(Job(id=job_id, job_type=job_type, payload=payload or {}))
+    db.session.commit()
+    return job_id
+
+
+def get_job(job_id: str):
+    """Get the status and result of an on-demand job (None if unknown or pruned)."""
+    job = db.session.get(Job, job_id)
+    return job.to_dict() if job else None
+
+
+def get_schedule():
+    """Get the recurring jobs and their next runs as last published by the scheduler process."""
+    jobs = db.session.scalars(db.select(ScheduledJob).order_by(ScheduledJob.next_run)).all()
+    return [job.to_dict() for job in jobs]
+
 
 class AutomationScheduler:
     """Manages scheduled automation tasks."""
     
-    def __init__(self, app: Flask):
-        """Initialize scheduler with Flask app context."""
+    def __init__(self, app: Flask, job_callbacks: dict = None):
+        """Initialize scheduler with Flask app context.
+        
+        job_callbacks maps a job type to a function called in app context
+        after each job of that type finishes.
+        """
         self.app = app
         self.scheduler = BackgroundScheduler()
         self.automation = AutomationEngine()
+        self.job_callbacks = job_callbacks or {}
+        self.job_handlers = {
+            'relist': self._relist_job,
+            'refresh_images': self._refresh_images_job,
+            'poshmark_scrape': self._poshmark_scrape_job,
+        }
         self._setup_jobs()
     
     def _setup_jobs(self):
@@ -33,6 +78,36 @@ class AutomationScheduler:
             replace_existing=True
         )
         
+        # Refresh precomputed dashboard counters every minute
+        self.scheduler.add_job(
+            func=self._run_refresh_stats,
+            trigger='interval',
+            seconds=60,
+            id='refresh_stats',
+            name='Refresh Dashboard Stats',
+            replace_existing=True
+        )
+        
+        # Pick up on-demand jobs queued by the web workers
+        self.scheduler.add_job(
+            func=self._poll_jobs,
+            trigger='interval',
+            seconds=Config.JOB_POLL_SECONDS,
+            id='poll_jobs',
+            name='Run Queued Jobs',
+            replace_existing=True
+        )
+        
+        # Drop finished on-demand jobs past the retention window
+        self.scheduler.add_job(
+            func=self._prune_jobs,
+            trigger='interval',
+            hours=24,
+            id='prune_jobs',
+            name='Prune Finished Jobs',
+            replace_existing=True
+        )
+        
         # Check for stale listings (daily at configured time)
         self.scheduler.add_job(
             func=self._run_stale_check,
@@ -70,6 +145,8 @@ class AutomationScheduler:
             replace_existing=True
         )
         
+        # Everything added so far recurs; one-shot queued jobs are added later
+        self.published_job_ids = {job.id for job in self.scheduler.get_jobs()} - UNPUBLISHED_JOBS
         logger.info("Scheduled jobs configured")
     
     def _run_sync_listings(self):
@@ -82,6 +159,14 @@ class AutomationScheduler:
             except Exception as e:
                 logger.error(f"Error in scheduled listing sync: {e}", exc_info=True)
     
+    def _run_refresh_stats(self):
+        """Refresh dashboard counters in app context."""
+        with self.app.app_context():
+            try:
+                self.automation.refresh_dashboard_stats()
+            except Exception as e:
+                logger.error(f"Error refreshing dashboard stats: {e}", exc_info=True)
+    
     def _run_stale_check(self):
         """Run stale listing check in app context."""
         with self.app.app_context():
@@ -122,10 +207,122 @@ class AutomationScheduler:
             except Exception as e:
                 logger.error(f"Error in scheduled feedback check: {e}", exc_info=True)
     
+    def _poll_jobs(self):
+        """Claim queued jobs and hand each one to a scheduler worker thread."""
+        with self.app.app_context():
+            try:
+                # Only this process claims jobs, so one UPDATE ... RETURNING
+                # takes everything queued since the last poll
+                claimed = db.session.execute(
+                    db.update(Job)
+                    .where(Job.status == 'queued')
+                    .values(status='running', started_at=datetime.utcnow())
+                    .returning(Job.id, Job.job_type, Job.payload)
+                ).all()
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error polling queued jobs: {e}", exc_info=True)
+                return
+        
+        for job in claimed:
+            # No trigger means run once, as soon as a worker thread is free
+            self.scheduler.add_job(
+                func=self._run_job,
+                args=[job.id, job.job_type, job.payload or {}],
+                id=job.id,
+                name=f'Job {job.id}'
+            )
+    
+    def _run_job(self, job_id: str, job_type: str, payload: dict):
+        """Run a claimed on-demand job in app context and record its outcome."""
+        with self.app.app_context():
+            try:
+                handler = self.job_handlers.get(job_type)
+                if handler is None:
+                    raise ValueError(f"Unknown job type: {job_type}")
+                result = handler(**payload)
+                status = 'success' if result.get('success') else 'failed'
+                logger.info(f"Queued job {job_id} finished: {status}")
+            except Exception as e:
+                logger.error(f"Error in queued job {job_id}: {e}", exc_info=True)
+                db.session.rollback()
+                result = {'success': False, 'error': str(e)}
+                status = 'failed'
+            
+            try:
+                db.session.execute(
+                    db.update(Job)
+                    .where(Job.id == job_id)
+                    .values(status=status, result=result, finished_at=datetime.utcnow())
+                )
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error recording result of job {job_id}: {e}", exc_info=True)
+                db.session.rollback()
+            
+            callback = self.job_callbacks.get(job_type)
+            if callback:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Error in completion callback for job {job_id}: {e}", exc_info=True)
+    
+    def _relist_job(self, item_id: str, reason: str = 'manual'):
+        """Relist one item and refresh the dashboard counters it changes."""
+        result = self.automation.relist_item(item_id, reason)
+        if result['success']:
+            self.automation.refresh_dashboard_stats()
+        return result
+    
+    def _refresh_images_job(self):
+        """Refresh gallery images for all active listings."""
+        return self.automation.refresh_images()
+    
+    def _poshmark_scrape_job(self, username: str):
+        """Scrape a user's Poshmark closet into the database."""
+        with PoshmarkScraperIntegration(headless=True) as scraper:
+            return scraper.scrape_user_listings(username)
+    
+    def _recover_jobs(self):
+        """Fail jobs left running by a previous scheduler process."""
+        with self.app.app_context():
+            try:
+                interrupted = db.session.execute(
+                    db.update(Job)
+                    .where(Job.status == 'running')
+                    .values(
+                        status='failed',
+                        result={'success': False, 'error': 'Interrupted by scheduler restart'},
+                        finished_at=datetime.utcnow()
+                    )
+                ).rowcount
+                db.session.commit()
+                if interrupted:
+                    logger.warning(f"Marked {interrupted} interrupted jobs as failed")
+            except Exception as e:
+                logger.error(f"Error recovering interrupted jobs: {e}", exc_info=True)
+    
+    def _prune_jobs(self):
+        """Delete finished on-demand jobs older than the retention window."""
+        with self.app.app_context():
+            try:
+                cutoff = datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+                db.session.execute(
+                    db.delete(Job).where(Job.status.in_(('success', 'failed')), Job.finished_at < cutoff)
+                )
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error pruning finished jobs: {e}", exc_info=True)
+    
     def start(self):
         """Start the scheduler."""
         if not self.scheduler.running:
+            self._recover_jobs()
+            self.scheduler.add_listener(
+                self._on_job_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED
+            )
             self.scheduler.start()
+            self._publish_schedule()
             logger.info("Scheduler started")
     
     def shutdown(self):
@@ -134,6 +331,31 @@ class AutomationScheduler:
             self.scheduler.shutdown()
             logger.info("Scheduler stopped")
     
+    def _on_job_event(self, event):
+        """Republish the schedule after a recurring job runs and its next run moves."""
+        if event.job_id in self.published_job_ids:
+            self._publish_schedule()
+    
+    def _publish_schedule(self):
+        """Write recurring jobs and their next runs to the database for web workers."""
+        with self.app.app_context():
+            try:
+                rows = []
+                for job in self.scheduler.get_jobs():
+                    if job.id not in self.published_job_ids:
+                        continue
+                    next_run = job.next_run_time
+                    if next_run is not None:
+                        next_run = next_run.astimezone(timezone.utc).replace(tzinfo=None)
+                    rows.append(ScheduledJob(id=job.id, name=job.name, trigger=str(job.trigger), next_run=next_run))
+                
+                db.session.execute(db.delete(ScheduledJob))
+                db.session.add_all(rows)
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error publishing job schedule: {e}", exc_info=True)
+                db.session.rollback()
+    
     def get_jobs(self):
         """Get list of scheduled jobs."""
         jobs = []